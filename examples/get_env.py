@@ -9,6 +9,9 @@ Usage:
     python get_env.py "kunde1 env"
     python get_env.py "Production API"
     
+    # Several records in one request (later records override earlier ones)
+    python get_env.py "shared env" "kunde1 env"
+    
     # Or with explicit tenant
     python get_env.py "kunde1 env" --tenant acme
     
@@ -20,7 +23,8 @@ Before first use:
     2. Set tenant: export IKV_TENANT=<your-tenant>
 """
 
-import argparse
+import re
+import shlex
 import sys
 import os
 
@@ -28,28 +32,44 @@ import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
 from ikv_secrets import env
+from ikv_secrets.auth import ensure_fresh_token
 from ikv_secrets.client import IKVClient, IKVClientError, TierError, AuthenticationError
 from ikv_secrets.config import get_tenant_url, get_config
-from ikv_secrets.keyring_store import get_token
+from ikv_secrets.env import _dotenv_escape
+from ikv_secrets.jsonlib import dumps
+
+# Keys whose values are masked in human-readable output
+_SENSITIVE_RE = re.compile(r"password|secret|key|token|api", re.IGNORECASE)
 
 
 def main():
+    # Read the environment once; both paths below use it
+    tenant = os.environ.get("IKV_TENANT")
+    url = os.environ.get("IKV_VAULT_URL")
+    
+    # Fast path: `get_env.py NAME` needs no option parsing
+    if len(sys.argv) == 2 and not sys.argv[1].startswith("-"):
+        return _fast_path(sys.argv[1], tenant, url)
+    
+    import argparse
+    
     parser = argparse.ArgumentParser(
         description="Fetch environment variables from IronKeyVault",
         epilog="Example: python get_env.py 'kunde1 env'"
     )
     parser.add_argument(
         "record",
-        help="Name or ID of the env record in IronKeyVault"
+        nargs="+",
+        help="Name or ID of the env record(s) in IronKeyVault"
     )
     parser.add_argument(
         "-t", "--tenant",
-        default=os.environ.get("IKV_TENANT"),
+        default=tenant,
         help="Tenant name (default: IKV_TENANT env var)"
     )
     parser.add_argument(
         "-u", "--url",
-        default=os.environ.get("IKV_VAULT_URL"),
+        default=url,
         help="Vault URL (default: from config or IKV_VAULT_URL)"
     )
     parser.add_argument(
@@ -74,9 +94,26 @@ def main():
     )
     
     args = parser.parse_args()
-    
+    _run(
+        args.record,
+        args.tenant,
+        args.url,
+        shell=args.shell,
+        dotenv=args.dotenv,
+        as_json=args.json,
+        quiet=args.quiet,
+    )
+
+
+def _fast_path(record, tenant, url):
+    """Fetch one record with human-readable output, skipping argparse."""
+    _run([record], tenant, url)
+
+
+def _run(records, tenant, url, shell=False, dotenv=False, as_json=False, quiet=False):
+    """Fetch records and print them in the requested format."""
     # Validate tenant
-    if not args.tenant:
+    if not tenant:
         print("Error: --tenant required or set IKV_TENANT environment variable", file=sys.stderr)
         print("\nExample:", file=sys.stderr)
         print("  export IKV_TENANT=acme", file=sys.stderr)
@@ -84,58 +121,68 @@ def main():
         sys.exit(1)
     
     # Get vault URL
-    url = args.url or get_tenant_url(args.tenant)
+    url = url or get_tenant_url(tenant)
     if not url:
-        print(f"Error: No URL configured for tenant '{args.tenant}'", file=sys.stderr)
-        print(f"\nRun: ikv-secrets login --tenant {args.tenant} --url https://your-vault.com", file=sys.stderr)
+        print(f"Error: No URL configured for tenant '{tenant}'", file=sys.stderr)
+        print(f"\nRun: ikv-secrets login --tenant {tenant} --url https://your-vault.com", file=sys.stderr)
         sys.exit(1)
     
-    # Check token
-    token = get_token(args.tenant)
+    # Check token (renewed first if it is about to expire)
+    token = ensure_fresh_token(tenant, url)
     if not token:
-        print(f"Error: Not logged in to '{args.tenant}'", file=sys.stderr)
-        print(f"\nRun: ikv-secrets login --tenant {args.tenant} --url {url}", file=sys.stderr)
+        print(f"Error: Not logged in to '{tenant}'", file=sys.stderr)
+        print(f"\nRun: ikv-secrets login --tenant {tenant} --url {url}", file=sys.stderr)
         sys.exit(1)
     
     if token.is_expired:
-        print(f"Error: Token expired for '{args.tenant}'", file=sys.stderr)
-        print(f"\nRun: ikv-secrets login --tenant {args.tenant} --url {url}", file=sys.stderr)
+        print(f"Error: Token expired for '{tenant}'", file=sys.stderr)
+        print(f"\nRun: ikv-secrets login --tenant {tenant} --url {url}", file=sys.stderr)
         sys.exit(1)
     
     # Fetch secrets
     try:
-        client = IKVClient(vault_url=url, tenant=args.tenant)
-        env_vars = client.get_env(args.record)
+        client = IKVClient(vault_url=url, tenant=tenant)
+        env_vars = {}
+        for variables in client.get_envs(records).values():
+            env_vars.update(variables)
         client.close()
         
         # Output format
-        if args.shell:
-            for key, value in env_vars.items():
-                escaped = value.replace("'", "'\"'\"'")
-                print(f"export {key}='{escaped}'")
+        lines = []
+        append = lines.append
+        
+        if shell:
+            # shlex.quote leaves safe values (URLs, tokens) unquoted
+            lines.extend(f"export {key}={shlex.quote(value)}" for key, value in env_vars.items())
         
-        elif args.dotenv:
+        elif dotenv:
             for key, value in env_vars.items():
-                escaped = value.replace('"', '\\"')
-                print(f'{key}="{escaped}"')
+                append(f'{key}="{_dotenv_escape(value)}"')
         
-        elif args.json:
-            import json
-            print(json.dumps(env_vars, indent=2))
+        elif as_json:
+            # Bytes straight to the binary buffer - orjson-backed when installed
+            sys.stdout.buffer.write(dumps(env_vars, indent=True) + b"\n")
         
         else:
             # Human readable
-            if not args.quiet:
-                print(f"✅ Loaded {len(env_vars)} variables from '{args.record}':")
-                print()
+            if not quiet:
+                records = ", ".join(f"'{r}'" for r in records)
+                append(f"✅ Loaded {len(env_vars)} variables from {records}:")
+                append("")
             
+            # Mask sensitive values, truncate long ones
+            sensitive = _SENSITIVE_RE.search
             for key, value in env_vars.items():
-                # Mask sensitive values
-                if any(s in key.lower() for s in ['password', 'secret', 'key', 'token', 'api']):
-                    display = value[:4] + "****" if len(value) > 4 else "****"
+                if sensitive(key):
+                    display = f"{value[:4]}****" if len(value) > 4 else "****"
                 else:
-                    display = value[:60] + "..." if len(value) > 60 else value
-                print(f"  {key}={display}")
+                    display = value if len(value) <= 60 else f"{value[:60]}..."
+                append(f"  {key}={display}")
+        
+        # One write instead of a print (and pipe flush) per variable
+        if lines:
+            sys.stdout.write("\n".join(lines))
+            sys.stdout.write("\n")
     
     except AuthenticationError as e:
         print(f"Error: Authentication failed - {e}", file=sys.stderr)
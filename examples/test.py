@@ -11,15 +11,20 @@ Before running:
     2. Set IKV_TENANT environment variable
 """
 
+import re
 import sys
 import os
+from concurrent.futures import ThreadPoolExecutor
 
 # Add src to path for local development
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
+from ikv_secrets.auth import ensure_fresh_token
 from ikv_secrets.client import IKVClient, IKVClientError, TierError, AuthenticationError
 from ikv_secrets.config import get_tenant_url, get_config
-from ikv_secrets.keyring_store import get_token
+
+# Keys whose values are masked in human-readable output
+_SENSITIVE_RE = re.compile(r"password|secret|key|token", re.IGNORECASE)
 
 
 def main():
@@ -38,7 +43,7 @@ def main():
     # Check config
     print("\n📋 Configuration:")
     config = get_config()
-    print(f"   Config file: ~/.config/ikv-secrets/config.json")
+    print(f"   Config file: ~/.ikv/config.json")
     print(f"   Tenants configured: {list(config.get('tenants', {}).keys())}")
     
     if not tenant:
@@ -59,7 +64,9 @@ def main():
     
     # Check token
     print("\n🔐 Authentication:")
-    token = get_token(tenant)
+    # Refresh up front (like get_env.py) so the parallel requests below
+    # never race to refresh the same token
+    token = ensure_fresh_token(tenant, url)
     if not token:
         print(f"   ❌ Not logged in to '{tenant}'")
         print(f"   Run: ikv-secrets login --tenant {tenant} --url {url}")
@@ -75,11 +82,17 @@ def main():
     # Create client
     print(f"\n🔗 Connecting to vault...")
     client = IKVClient(vault_url=url, tenant=tenant)
+    client._get_auth_headers()  # Both workers reuse these cached headers
+    
+    # List and fetch in parallel - both requests share one HTTP/2 connection
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        records_future = pool.submit(client.list_env_records)
+        env_future = pool.submit(client.get_envs, [record_name])
     
     # List records
     print("\n📂 Available env records:")
     try:
-        records = client.list_env_records()
+        records = records_future.result()
         if not records:
             print("   (none)")
         for r in records:
@@ -91,13 +104,13 @@ def main():
     # Fetch specific record
     print(f"\n🔑 Fetching record: '{record_name}'")
     try:
-        env_vars = client.get_env(record_name)
+        env_vars = env_future.result()[record_name]
         
         print(f"   ✅ Found {len(env_vars)} variables:")
         print()
         for key, value in env_vars.items():
             # Mask sensitive values
-            if any(s in key.lower() for s in ['password', 'secret', 'key', 'token']):
+            if _SENSITIVE_RE.search(key):
                 display_value = value[:4] + "****" if len(value) > 4 else "****"
             else:
                 display_value = value[:50] + "..." if len(value) > 50 else value
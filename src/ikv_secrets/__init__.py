@@ -8,9 +8,24 @@ Usage:
     API_KEY = env.API_KEY
 """
 
+from typing import TYPE_CHECKING, Any
+
 from ikv_secrets.env import env, EnvProxy
-from ikv_secrets.client import IKVClient
-from ikv_secrets.auth import login, logout
+
+if TYPE_CHECKING:
+    from ikv_secrets.client import IKVClient
+    from ikv_secrets.auth import login, logout
 
 __version__ = "0.1.0"
 __all__ = ["env", "EnvProxy", "IKVClient", "login", "logout"]
+
+
+def __getattr__(name: str) -> Any:
+    """Import the client and auth modules (and httpx) on first use."""
+    if name == "IKVClient":
+        from ikv_secrets.client import IKVClient
+        return IKVClient
+    if name in ("login", "logout"):
+        from ikv_secrets import auth
+        return getattr(auth, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
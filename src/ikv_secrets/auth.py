@@ -6,32 +6,49 @@ Implements ADR-063: SDK login follows normal user-app login flow via browser.
 
 from __future__ import annotations
 
-import http.server
-import platform
+import base64
+import functools
+import html
+import json
+import re
+import selectors
 import socket
+import sys
 import threading
 import time
 import urllib.parse
-import webbrowser
 from typing import Optional
 
 import httpx
 
-from ikv_secrets.keyring_store import save_token, delete_token, TokenInfo
+from ikv_secrets.cache import clear_cache
+from ikv_secrets.keyring_store import EXPIRY_BUFFER, get_token, save_token, delete_token, TokenInfo
 from ikv_secrets.config import get_config, save_tenant_config
+from ikv_secrets.jsonlib import loads
+from ikv_secrets.transport import get_http_client
 
 
 # Default vault URL for local development
 DEFAULT_VAULT_URL = "https://localhost:5001"
 
+# Refresh tokens this many seconds (or 10% of their lifetime) before expiry;
+# never less than EXPIRY_BUFFER, so tokens are renewed before they count as expired
+REFRESH_MARGIN = EXPIRY_BUFFER
+
+# Serializes refreshes so a rotated refresh token is only spent once
+_REFRESH_LOCK = threading.Lock()
+
 
 class AuthError(Exception):
     """Authentication error."""
     pass
 
 
-def get_device_fingerprint() -> dict:
-    """Collect device fingerprint for session binding."""
+@functools.lru_cache(maxsize=1)
+def _collect_device_fingerprint() -> dict:
+    """Collect the device fingerprint once per process."""
+    import platform
+    
     return {
         "os": platform.system(),
         "os_version": platform.release(),
@@ -42,6 +59,18 @@ def get_device_fingerprint() -> dict:
     }
 
 
+def get_device_fingerprint() -> dict:
+    """Collect device fingerprint for session binding (cached per process)."""
+    return dict(_collect_device_fingerprint())
+
+
+@functools.lru_cache(maxsize=1)
+def _device_fingerprint_param() -> str:
+    """Device fingerprint as URL-safe base64 of compact, sorted JSON."""
+    data = json.dumps(_collect_device_fingerprint(), sort_keys=True, separators=(",", ":"))
+    return base64.urlsafe_b64encode(data.encode()).decode()
+
+
 def login(
     tenant: str,
     vault_url: Optional[str] = None,
@@ -68,24 +97,251 @@ def login(
     Returns:
         TokenInfo with access token
     """
-    # Resolve vault URL
+    vault_url = _resolve_vault_url(tenant, vault_url)
+    
+    # Service account flow (non-interactive CI/CD)
+    if api_key and master_key:
+        return _service_account_login(tenant, vault_url, api_key, master_key)
+    
+    # Browser login flow (normal user login)
+    return _browser_login(tenant, vault_url, force_login=force_login)
+
+
+def _resolve_vault_url(tenant: str, vault_url: Optional[str]) -> str:
+    """
+    Resolve the vault URL from the argument, tenant config or default.
+    
+    Set ``require_explicit_url: true`` in the config to fail instead of
+    falling back to DEFAULT_VAULT_URL.
+    """
     if not vault_url:
         config = get_config()
         tenant_config = config.get("tenants", {}).get(tenant, {})
         vault_url = tenant_config.get("url")
+        
+        if not vault_url and config.get("require_explicit_url"):
+            raise AuthError(
+                f"No vault URL for tenant '{tenant}'. "
+                f"Run 'ikv-secrets login --tenant {tenant} --url <vault-url>' first."
+            )
     
     if not vault_url:
         vault_url = DEFAULT_VAULT_URL
         print(f"ℹ️  Using default vault URL: {vault_url}")
     
-    vault_url = vault_url.rstrip("/")
+    return vault_url.rstrip("/")
+
+
+def _token_from_response(tenant: str, token_data: dict) -> TokenInfo:
+    """Build TokenInfo from a token endpoint response."""
+    now = int(time.time())
+    return TokenInfo(
+        access_token=token_data["access_token"],
+        expires_at=token_data.get("expires_at", now + token_data.get("expires_in", 14400)),
+        tenant=tenant,
+        refresh_token=token_data.get("refresh_token"),
+        refresh_expires_at=token_data.get("refresh_expires_at", 0),
+        issued_at=now,
+    )
+
+
+def refresh_at(token: TokenInfo) -> float:
+    """
+    Get the time from which ensure_fresh_token renews a token.
+    
+    Args:
+        token: Stored token
+        
+    Returns:
+        Unix timestamp REFRESH_MARGIN (or 10% of the lifetime) before expiry
+    """
+    lifetime = token.expires_at - token.issued_at if token.issued_at else 0
+    return token.expires_at - max(REFRESH_MARGIN, 0.1 * lifetime)
+
+
+def _refresh_due(token: TokenInfo) -> bool:
+    """Check if a token is within its refresh margin and can be refreshed."""
+    if time.time() <= refresh_at(token):
+        return False
+    if not token.refresh_token:
+        return False
+    return not (token.refresh_expires_at and token.refresh_expires_at <= time.time())
+
+
+def ensure_fresh_token(tenant: str, vault_url: Optional[str] = None) -> Optional[TokenInfo]:
+    """
+    Get the stored token, refreshing it before it expires.
     
-    # Service account flow (non-interactive CI/CD)
-    if api_key and master_key:
-        return _service_account_login(tenant, vault_url, api_key, master_key)
+    When the token is within REFRESH_MARGIN (or 10% of its lifetime) of
+    expiry, it is renewed with the stored refresh token. Refreshes are
+    serialized, so concurrent callers share one refresh. If the vault rejects
+    the refresh token and a terminal is attached, falls back to browser login.
     
-    # Browser login flow (normal user login)
-    return _browser_login(tenant, vault_url, force_login=force_login)
+    Args:
+        tenant: Tenant name
+        vault_url: Vault URL (optional, defaults to tenant config)
+        
+    Returns:
+        TokenInfo if logged in, None otherwise
+    """
+    token = get_token(tenant)
+    if not token or not _refresh_due(token):
+        return token
+    
+    with _REFRESH_LOCK:
+        # Another thread may have refreshed (and rotated the refresh token)
+        # while we waited
+        token = get_token(tenant)
+        if not token or not _refresh_due(token):
+            return token
+        return _refresh_token(tenant, token, vault_url)
+
+
+def _refresh_token(tenant: str, token: TokenInfo, vault_url: Optional[str]) -> TokenInfo:
+    """Exchange the refresh token for a new token (caller holds _REFRESH_LOCK)."""
+    vault_url = _resolve_vault_url(tenant, vault_url)
+    try:
+        response = get_http_client(vault_url).post(
+            "/auth/oauth/refresh",
+            json={
+                "refresh_token": token.refresh_token,
+                "tenant": tenant,
+            },
+        )
+    except httpx.HTTPError:
+        return token  # Keep the current token; the API call reports any failure
+    
+    if response.is_success:
+        try:
+            refreshed = _token_from_response(tenant, loads(response.content))
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return token  # Malformed response: treat as a failed refresh
+        if not refreshed.refresh_token:
+            refreshed.refresh_token = token.refresh_token
+            refreshed.refresh_expires_at = token.refresh_expires_at
+        save_token(tenant, refreshed)
+        return refreshed
+    
+    # Refresh token rejected - re-authenticate if someone can complete the
+    # login. Other errors (408, 429, 5xx) are transient: keep the token.
+    if response.status_code in (400, 401) and sys.stdin.isatty() and sys.stdout.isatty():
+        return _browser_login(tenant, vault_url)
+    
+    return token
+
+
+def _http_response(status: str, body: bytes = b"") -> bytes:
+    """Build a complete HTTP/1.1 response for the callback socket."""
+    return (
+        f"HTTP/1.1 {status}\r\n"
+        f"Content-Type: text/html; charset=utf-8\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: close\r\n\r\n"
+    ).encode() + body
+
+
+# Callback pages are only shown for a moment, so they are kept unstyled
+_SUCCESS_RESPONSE = _http_response(
+    "200 OK",
+    b"<!doctype html><title>Login Successful</title>"
+    b"<h1>&#x2705; Login Successful!</h1>"
+    b"<p>You can close this window and return to your terminal.</p>"
+    b"<script>setTimeout(() => window.close(), 2000);</script>",
+)
+_NOT_FOUND_RESPONSE = _http_response("404 Not Found")
+_ERROR_TEMPLATE = (
+    "<!doctype html><title>Login Failed</title>"
+    "<h1>&#x274C; Login Failed</h1><p>{err}</p>"
+)
+_REQUEST_LINE_RE = re.compile(rb"GET (\S+) HTTP/")
+
+
+_CALLBACK_PARAMS = frozenset(("code", "state", "error", "error_description"))
+
+
+def _scan_query(path: str) -> dict[str, str]:
+    """
+    Extract the OAuth callback parameters from a request path.
+    
+    Like parse_qs, blank values are skipped and the first occurrence wins.
+    """
+    out: dict[str, str] = {}
+    for part in path.partition("?")[2].split("&"):
+        key, _, value = part.partition("=")
+        if key in _CALLBACK_PARAMS and value and key not in out:
+            out[key] = urllib.parse.unquote_plus(value)
+    return out
+
+
+def _respond(conn: socket.socket, response: bytes) -> None:
+    """
+    Send a response and shut the connection down cleanly.
+    
+    Closing a socket with unread request bytes makes the OS send a reset,
+    which browsers show as a failed page even after a successful login. So
+    half-close first and drain what the browser sent before closing.
+    """
+    try:
+        conn.sendall(response)
+        conn.shutdown(socket.SHUT_WR)
+        conn.settimeout(1.0)
+        while conn.recv(4096):
+            pass
+    except OSError:
+        pass  # Browser went away; the callback result is still valid
+
+
+def _wait_for_callback(server: socket.socket, timeout: float) -> dict[str, str]:
+    """
+    Serve the OAuth redirect on a listening socket.
+    
+    Requests that carry neither a code nor an error (e.g. favicon probes)
+    are answered with 404 and waiting continues.
+    
+    Args:
+        server: Listening socket
+        timeout: Seconds to wait for the redirect
+        
+    Returns:
+        Dict with "code" and "state", or "error"; empty on timeout
+    """
+    deadline = time.monotonic() + timeout
+    with selectors.DefaultSelector() as selector:
+        selector.register(server, selectors.EVENT_READ)
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not selector.select(remaining):
+                return {}
+            
+            conn, _ = server.accept()
+            with conn:
+                conn.settimeout(5.0)
+                try:
+                    match = _REQUEST_LINE_RE.match(conn.recv(4096))
+                except OSError:
+                    continue
+                
+                path = match.group(1).decode("latin-1") if match else ""
+                params = _scan_query(path)
+                
+                if "code" in params:
+                    # Got authorization code - exchange for token
+                    result = {
+                        "code": params["code"],
+                        "state": params.get("state", ""),
+                    }
+                    response = _SUCCESS_RESPONSE
+                elif "error" in params:
+                    # Login failed
+                    result = {"error": params.get("error_description", params["error"])}
+                    body = _ERROR_TEMPLATE.format(err=html.escape(result["error"]))
+                    response = _http_response("400 Bad Request", body.encode("utf-8", "replace"))
+                else:
+                    _respond(conn, _NOT_FOUND_RESPONSE)
+                    continue
+                
+                _respond(conn, response)
+                return result
 
 
 def _browser_login(tenant: str, vault_url: str, force_login: bool = False) -> TokenInfo:
@@ -101,103 +357,23 @@ def _browser_login(tenant: str, vault_url: str, force_login: bool = False) -> To
         vault_url: Vault URL
         force_login: If True, always require fresh login even if browser has session
     """
-    # Start local callback server
-    callback_received = threading.Event()
-    auth_result: dict = {}
-    
-    class CallbackHandler(http.server.BaseHTTPRequestHandler):
-        def do_GET(self) -> None:
-            parsed = urllib.parse.urlparse(self.path)
-            params = urllib.parse.parse_qs(parsed.query)
-            
-            if "code" in params:
-                # Got authorization code - exchange for token
-                auth_result["code"] = params["code"][0]
-                auth_result["state"] = params.get("state", [""])[0]
-                self.send_response(200)
-                self.send_header("Content-type", "text/html")
-                self.end_headers()
-                self.wfile.write(b"""
-                    <!DOCTYPE html>
-                    <html>
-                    <head>
-                        <title>Login Successful</title>
-                        <style>
-                            body { font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-                                   background: #0a0f1a; color: #fff; display: flex; justify-content: center;
-                                   align-items: center; height: 100vh; margin: 0; }
-                            .container { text-align: center; }
-                            h1 { color: #10b981; margin-bottom: 1rem; }
-                            p { color: #888; }
-                        </style>
-                    </head>
-                    <body>
-                        <div class="container">
-                            <h1>&#x2705; Login Successful!</h1>
-                            <p>You can close this window and return to your terminal.</p>
-                        </div>
-                        <script>setTimeout(() => window.close(), 2000);</script>
-                    </body>
-                    </html>
-                """)
-            elif "error" in params:
-                # Login failed
-                auth_result["error"] = params.get("error_description", params["error"])[0]
-                self.send_response(400)
-                self.send_header("Content-type", "text/html")
-                self.end_headers()
-                error_msg = auth_result.get('error', 'Unknown error')
-                self.wfile.write(f"""
-                    <!DOCTYPE html>
-                    <html>
-                    <head>
-                        <title>Login Failed</title>
-                        <style>
-                            body {{ font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-                                   background: #0a0f1a; color: #fff; display: flex; justify-content: center;
-                                   align-items: center; height: 100vh; margin: 0; }}
-                            .container {{ text-align: center; }}
-                            h1 {{ color: #ef4444; margin-bottom: 1rem; }}
-                            p {{ color: #888; }}
-                        </style>
-                    </head>
-                    <body>
-                        <div class="container">
-                            <h1>&#x274C; Login Failed</h1>
-                            <p>{error_msg}</p>
-                        </div>
-                    </body>
-                    </html>
-                """.encode())
-            else:
-                self.send_response(400)
-                self.end_headers()
-            
-            callback_received.set()
-        
-        def log_message(self, format: str, *args) -> None:
-            pass  # Suppress logging
-    
-    # Find available port
-    server = http.server.HTTPServer(("127.0.0.1", 0), CallbackHandler)
-    port = server.server_address[1]
+    # Listen for the OAuth redirect on an available port
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(("127.0.0.1", 0))
+    server.listen(1)
+    port = server.getsockname()[1]
     callback_url = f"http://127.0.0.1:{port}/callback"
     
-    # Start server in background thread
-    server_thread = threading.Thread(target=server.handle_request)
-    server_thread.start()
-    
     # Generate state for CSRF protection
     import secrets as sec
     state = sec.token_urlsafe(16)
     
     # Build auth URL - use OAuth start endpoint
-    device_info = get_device_fingerprint()
     auth_params = urllib.parse.urlencode({
         "redirect_uri": callback_url,
         "state": state,
-        "device_fingerprint": urllib.parse.quote(str(device_info)),
-        "force_login": "1" if force_login else "0",
+        "device_fingerprint": _device_fingerprint_param(),
+        "force_login": int(force_login),
     })
     auth_url = f"{vault_url}/auth/oauth/start?{auth_params}"
     
@@ -209,13 +385,16 @@ def _browser_login(tenant: str, vault_url: str, force_login: bool = False) -> To
     print(f"   {auth_url}")
     print()
     
-    # Open browser
+    # Open browser (imported here - webbrowser pulls in subprocess and shlex)
+    import webbrowser
     webbrowser.open(auth_url)
     
     # Wait for callback (5 minute timeout)
     print("   ⏳ Waiting for login...")
-    callback_received.wait(timeout=300)
-    server.server_close()
+    try:
+        auth_result = _wait_for_callback(server, timeout=300)
+    finally:
+        server.close()
     
     if "error" in auth_result:
         raise AuthError(f"Authentication failed: {auth_result['error']}")
@@ -226,31 +405,24 @@ def _browser_login(tenant: str, vault_url: str, force_login: bool = False) -> To
     # Exchange authorization code for token
     print("   🔄 Exchanging code for token...")
     try:
-        # Use a client with SSL verification disabled for localhost/dev
-        with httpx.Client(verify=False, timeout=30.0) as client:
-            response = client.post(
-                f"{vault_url}/auth/oauth/token",
-                json={
-                    "code": auth_result["code"],
-                    "redirect_uri": callback_url,
-                },
-            )
+        response = get_http_client(vault_url).post(
+            "/auth/oauth/token",
+            json={
+                "code": auth_result["code"],
+                "redirect_uri": callback_url,
+            },
+        )
         
         if not response.is_success:
-            error_data = response.json() if response.headers.get('content-type', '').startswith('application/json') else {}
+            error_data = loads(response.content) if response.headers.get('content-type', '').startswith('application/json') else {}
             raise AuthError(error_data.get("error_description", f"Token exchange failed: {response.status_code}"))
         
-        token_data = response.json()
+        token_data = loads(response.content)
         
     except httpx.ConnectError:
         raise AuthError(f"Cannot connect to {vault_url}")
     
-    # Create token info
-    token = TokenInfo(
-        access_token=token_data["access_token"],
-        expires_at=token_data.get("expires_at", int(time.time()) + token_data.get("expires_in", 14400)),
-        tenant=tenant,
-    )
+    token = _token_from_response(tenant, token_data)
     
     save_token(tenant, token)
     save_tenant_config(tenant, vault_url)
@@ -268,15 +440,14 @@ def _service_account_login(
 ) -> TokenInfo:
     """Authenticate using service account credentials (CI/CD)."""
     try:
-        with httpx.Client(verify=False, timeout=30.0) as client:
-            response = client.post(
-                f"{vault_url}/api/v1/auth/service-account",
-                json={
-                    "tenant": tenant,
-                    "api_key": api_key,
-                    "master_key": master_key,
-                },
-            )
+        response = get_http_client(vault_url).post(
+            "/api/v1/auth/service-account",
+            json={
+                "tenant": tenant,
+                "api_key": api_key,
+                "master_key": master_key,
+            },
+        )
         
         if response.status_code == 401:
             raise AuthError("Invalid service account credentials")
@@ -285,12 +456,7 @@ def _service_account_login(
         
         response.raise_for_status()
         
-        data = response.json()
-        token = TokenInfo(
-            access_token=data["access_token"],
-            expires_at=data["expires_at"],
-            tenant=tenant,
-        )
+        token = _token_from_response(tenant, loads(response.content))
         
         save_token(tenant, token)
         save_tenant_config(tenant, vault_url)
@@ -303,11 +469,17 @@ def _service_account_login(
 
 def logout(tenant: Optional[str] = None) -> None:
     """
-    Clear stored credentials.
+    Clear stored credentials and cached records.
     
     Args:
         tenant: Specific tenant to logout from (None = all)
     """
+    clear_cache(tenant)
+    
+    # Shared clients hold the old token and its auth headers
+    from ikv_secrets.client import _get_client
+    _get_client.cache_clear()
+    
     if tenant:
         delete_token(tenant)
     else:
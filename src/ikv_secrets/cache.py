@@ -0,0 +1,245 @@
+"""
+Short-lived cache for fetched env records.
+
+Records are kept in memory and, when ``cryptography`` is installed, on disk
+encrypted with a key derived from the current access token - a cache file is
+useless without the token that wrote it. Entries are keyed on the vault URL,
+tenant, record and a digest of the credential that fetched them, and only
+live as long as the vault allows via ``Cache-Control: max-age``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+from ikv_secrets.fsutil import write_private
+
+try:
+    from cryptography.exceptions import InvalidTag
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+    CRYPTO_AVAILABLE = True
+except ImportError:
+    CRYPTO_AVAILABLE = False
+
+
+CACHE_DIR = Path.home() / ".cache" / "ikv-secrets"
+MEMORY_MAXSIZE = 128
+
+# (vault_url, tenant, record_id, credential digest) -> (expires_at, variables)
+_MemoryKey = tuple[str, str, str, str]
+_memory: OrderedDict[_MemoryKey, tuple[float, dict[str, str]]] = OrderedDict()
+_memory_lock = threading.Lock()
+
+
+def parse_max_age(cache_control: Optional[str]) -> int:
+    """
+    Get the cache lifetime allowed by a Cache-Control header.
+
+    Args:
+        cache_control: Cache-Control header value
+
+    Returns:
+        Lifetime in seconds (0 = do not cache)
+    """
+    if not cache_control:
+        return 0
+
+    max_age = 0
+    for directive in cache_control.lower().split(","):
+        name, _, value = directive.strip().partition("=")
+        if name in ("no-store", "no-cache"):
+            return 0
+        if name == "max-age":
+            try:
+                max_age = max(0, int(value.strip('"')))
+            except ValueError:
+                return 0
+    return max_age
+
+
+def _tenant_dir(tenant: str) -> Path:
+    """Get the cache directory of a tenant (hashed, never a raw path component)."""
+    return CACHE_DIR / hashlib.sha256(tenant.encode()).hexdigest()
+
+
+def _cache_path(vault_url: str, tenant: str, record_id: str) -> Path:
+    """Get the cache file path for a record."""
+    digest = hashlib.sha256(f"{vault_url}\0{record_id}".encode()).hexdigest()
+    return _tenant_dir(tenant) / f"{digest}.json.enc"
+
+
+def _credential_digest(credential: str) -> str:
+    """Identify a credential without keeping it in the memory cache."""
+    return hashlib.sha256(b"ikv-secrets-cache-id:" + credential.encode()).hexdigest()
+
+
+def _derive_key(access_token: str) -> bytes:
+    """Derive the AES-256 cache key from an access token."""
+    return hashlib.sha256(b"ikv-secrets-cache:" + access_token.encode()).digest()
+
+
+def _read_disk(
+    vault_url: str, tenant: str, record_id: str, access_token: str
+) -> Optional[tuple[float, dict[str, str]]]:
+    """Read and decrypt a cached record from disk."""
+    path = _cache_path(vault_url, tenant, record_id)
+    try:
+        blob = path.read_bytes()
+    except OSError:
+        return None
+
+    aad = f"{vault_url}\0{tenant}\0{record_id}".encode()
+    try:
+        plaintext = AESGCM(_derive_key(access_token)).decrypt(blob[:12], blob[12:], aad)
+        payload = json.loads(plaintext)
+        return float(payload["expires_at"]), payload["variables"]
+    except (InvalidTag, ValueError, KeyError, TypeError):
+        return None
+
+
+def _write_disk(
+    vault_url: str,
+    tenant: str,
+    record_id: str,
+    access_token: str,
+    expires_at: float,
+    variables: dict[str, str],
+) -> None:
+    """Encrypt and write a record to the disk cache."""
+    path = _cache_path(vault_url, tenant, record_id)
+    payload = json.dumps({"expires_at": expires_at, "variables": variables}).encode()
+    aad = f"{vault_url}\0{tenant}\0{record_id}".encode()
+    nonce = os.urandom(12)
+    blob = nonce + AESGCM(_derive_key(access_token)).encrypt(nonce, payload, aad)
+
+    try:
+        path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        write_private(path, blob)
+    except OSError:
+        pass  # Cache is best effort
+
+
+def get_cached_env(
+    vault_url: str,
+    tenant: str,
+    record_id: str,
+    credential: Optional[str],
+    disk: bool = True,
+) -> Optional[dict[str, str]]:
+    """
+    Get a cached record if it has not expired.
+
+    Args:
+        vault_url: Vault URL the record was fetched from
+        tenant: Tenant name
+        record_id: Record ID or name
+        credential: Access token (or service-account secret) used for the
+            fetch; None disables the cache
+        disk: Also look in the disk cache (keyed by the credential)
+
+    Returns:
+        Copy of the cached variables, or None on a miss
+    """
+    if not credential:
+        return None
+
+    key = (vault_url, tenant, record_id, _credential_digest(credential))
+    now = time.time()
+
+    with _memory_lock:
+        entry = _memory.get(key)
+        if entry is not None:
+            if entry[0] > now:
+                _memory.move_to_end(key)
+                return dict(entry[1])
+            del _memory[key]
+
+    if not (disk and CRYPTO_AVAILABLE):
+        return None
+
+    entry = _read_disk(vault_url, tenant, record_id, credential)
+    if entry is None or entry[0] <= now:
+        return None
+
+    _remember(key, entry)
+    return dict(entry[1])
+
+
+def set_cached_env(
+    vault_url: str,
+    tenant: str,
+    record_id: str,
+    variables: dict[str, str],
+    ttl: int,
+    credential: Optional[str],
+    disk: bool = True,
+) -> None:
+    """
+    Cache a record for ttl seconds.
+
+    Args:
+        vault_url: Vault URL the record was fetched from
+        tenant: Tenant name
+        record_id: Record ID or name
+        variables: Environment variables of the record
+        ttl: Lifetime in seconds
+        credential: Access token (or service-account secret) used for the
+            fetch; None disables the cache
+        disk: Also write the disk cache (encrypted with the credential)
+    """
+    if ttl <= 0 or not credential:
+        return
+
+    expires_at = time.time() + ttl
+    variables = dict(variables)
+    _remember((vault_url, tenant, record_id, _credential_digest(credential)), (expires_at, variables))
+
+    if disk and CRYPTO_AVAILABLE:
+        _write_disk(vault_url, tenant, record_id, credential, expires_at, variables)
+
+
+def _remember(key: _MemoryKey, entry: tuple[float, dict[str, str]]) -> None:
+    """Store an entry in the in-memory LRU."""
+    with _memory_lock:
+        _memory[key] = entry
+        _memory.move_to_end(key)
+        while len(_memory) > MEMORY_MAXSIZE:
+            _memory.popitem(last=False)
+
+
+def clear_cache(tenant: Optional[str] = None) -> None:
+    """
+    Remove cached records.
+
+    Args:
+        tenant: Specific tenant to clear (None = all)
+    """
+    with _memory_lock:
+        if tenant is None:
+            _memory.clear()
+        else:
+            for key in [k for k in _memory if k[1] == tenant]:
+                del _memory[key]
+
+    if tenant is not None:
+        dirs = [_tenant_dir(tenant)]
+    elif CACHE_DIR.is_dir():
+        dirs = [p for p in CACHE_DIR.iterdir() if p.is_dir()]
+    else:
+        dirs = []
+
+    for directory in dirs:
+        if not directory.is_dir():
+            continue
+        for path in directory.iterdir():
+            try:
+                path.unlink()
+            except OSError:
+                pass
@@ -11,10 +11,16 @@ from typing import Optional
 import click
 
 from ikv_secrets import __version__
-from ikv_secrets.auth import login as do_login, logout as do_logout, AuthError
-from ikv_secrets.client import IKVClient, IKVClientError, TierError
-from ikv_secrets.keyring_store import get_token
-from ikv_secrets.config import get_config
+from ikv_secrets.env import _dotenv_escape
+
+# Commands import what they need, so --help and --version stay fast
+
+
+def _shell_quote(value: str) -> str:
+    """Quote a value as a single-quoted shell word."""
+    if "'" in value:
+        value = value.replace("'", "'\"'\"'")
+    return f"'{value}'"
 
 
 @click.group()
@@ -40,13 +46,19 @@ def login(
     force_login: bool,
 ) -> None:
     """Login to IronKeyVault."""
-    # Check if already logged in
-    existing_token = get_token(tenant)
-    if existing_token and not existing_token.is_expired and not force and not force_login:
-        minutes_left = existing_token.expires_in // 60
-        click.echo(f"✓ Already logged in to '{tenant}' (expires in {minutes_left} minutes)")
-        click.echo(f"  Use --force to re-login")
-        return
+    from ikv_secrets.auth import login as do_login, AuthError
+    
+    # Check if already logged in (pointless when re-login is forced)
+    if not force and not force_login:
+        from ikv_secrets.keyring_store import get_token
+        
+        existing_token = get_token(tenant)
+        expired, expires_in = existing_token.expiry_view() if existing_token else (True, 0)
+        if not expired:
+            minutes_left = expires_in // 60
+            click.echo(f"✓ Already logged in to '{tenant}' (expires in {minutes_left} minutes)")
+            click.echo(f"  Use --force to re-login")
+            return
     
     try:
         token = do_login(
@@ -66,6 +78,8 @@ def login(
 @click.option("--tenant", "-t", help="Tenant to logout from (all if not specified)")
 def logout(tenant: Optional[str]) -> None:
     """Clear stored credentials."""
+    from ikv_secrets.auth import logout as do_logout
+    
     do_logout(tenant)
     if tenant:
         click.echo(f"✓ Logged out from '{tenant}'")
@@ -76,6 +90,9 @@ def logout(tenant: Optional[str]) -> None:
 @main.command()
 def status() -> None:
     """Show authentication status."""
+    from ikv_secrets.config import get_config
+    from ikv_secrets.keyring_store import get_all_tokens
+    
     config = get_config()
     tenants = config.get("tenants", {})
     
@@ -83,12 +100,14 @@ def status() -> None:
         click.echo("No tenants configured. Run 'ikv-secrets login --tenant <name>' first.")
         return
     
+    tokens = get_all_tokens(tenants)
     for tenant_name, tenant_config in tenants.items():
-        token = get_token(tenant_name)
+        token = tokens.get(tenant_name)
         url = tenant_config.get("url", "unknown")
+        expired, expires_in = token.expiry_view() if token else (True, 0)
         
-        if token and not token.is_expired:
-            minutes = token.expires_in // 60
+        if token and not expired:
+            minutes = expires_in // 60
             click.echo(f"✓ {tenant_name}: logged in (expires in {minutes}m) - {url}")
         elif token:
             click.echo(f"✗ {tenant_name}: token expired - {url}")
@@ -100,6 +119,9 @@ def status() -> None:
 @click.option("--tenant", "-t", envvar="IKV_TENANT", help="Tenant name")
 def list_records(tenant: Optional[str]) -> None:
     """List available env records."""
+    from ikv_secrets.client import IKVClient, IKVClientError, TierError, _get_client
+    from ikv_secrets.config import get_tenant_url
+    
     if not tenant:
         click.echo("Error: --tenant required or set IKV_TENANT", err=True)
         sys.exit(1)
@@ -107,12 +129,11 @@ def list_records(tenant: Optional[str]) -> None:
     try:
         client = IKVClient.from_env() if os.environ.get("IKV_VAULT_URL") else None
         if not client:
-            from ikv_secrets.config import get_tenant_url
             url = get_tenant_url(tenant)
             if not url:
                 click.echo(f"Error: No URL for tenant '{tenant}'", err=True)
                 sys.exit(1)
-            client = IKVClient(vault_url=url, tenant=tenant)
+            client = _get_client(url, tenant)
         
         records = client.list_env_records()
         
@@ -142,24 +163,26 @@ def load(record: str, tenant: Optional[str], by_id: bool) -> None:
     Usage:
         eval $(ikv-secrets load prod-api)
     """
+    from ikv_secrets.client import IKVClientError, TierError, _get_client
+    from ikv_secrets.config import get_tenant_url
+    
     if not tenant:
         click.echo("# Error: --tenant required or set IKV_TENANT", err=True)
         sys.exit(1)
     
     try:
-        from ikv_secrets.config import get_tenant_url
         url = get_tenant_url(tenant)
         if not url:
             click.echo(f"# Error: No URL for tenant '{tenant}'", err=True)
             sys.exit(1)
         
-        client = IKVClient(vault_url=url, tenant=tenant)
+        client = _get_client(url, tenant)
         env_vars = client.get_env(record)
         
-        for key, value in env_vars.items():
-            # Escape for shell
-            escaped = value.replace("'", "'\"'\"'")
-            click.echo(f"export {key}='{escaped}'")
+        # Escape for shell; emitted with a single write
+        lines = [f"export {key}={_shell_quote(value)}" for key, value in env_vars.items()]
+        if lines:
+            click.echo("\n".join(lines))
     
     except TierError as e:
         click.echo(f"# Error: {e}", err=True)
@@ -183,35 +206,36 @@ def export(record: str, tenant: Optional[str], fmt: str) -> None:
         ikv-secrets export prod-api > .env
         ikv-secrets export prod-api -f docker > docker.env
     """
+    from ikv_secrets.client import IKVClientError, TierError, _get_client
+    from ikv_secrets.config import get_tenant_url
+    from ikv_secrets.jsonlib import dumps
+    
     if not tenant:
         click.echo("# Error: --tenant required or set IKV_TENANT", err=True)
         sys.exit(1)
     
     try:
-        from ikv_secrets.config import get_tenant_url
-        import json
-        
         url = get_tenant_url(tenant)
         if not url:
             click.echo(f"# Error: No URL for tenant '{tenant}'", err=True)
             sys.exit(1)
         
-        client = IKVClient(vault_url=url, tenant=tenant)
+        client = _get_client(url, tenant)
         env_vars = client.get_env(record)
         
         if fmt == "json":
-            click.echo(json.dumps(env_vars, indent=2))
-        elif fmt == "shell":
-            for key, value in env_vars.items():
-                escaped = value.replace("'", "'\"'\"'")
-                click.echo(f"export {key}='{escaped}'")
+            click.echo(dumps(env_vars, indent=True).decode())
+            return
+        
+        # Build the whole output and emit it with a single write
+        if fmt == "shell":
+            lines = [f"export {key}={_shell_quote(value)}" for key, value in env_vars.items()]
         elif fmt == "docker":
-            for key, value in env_vars.items():
-                click.echo(f"{key}={value}")
+            lines = [f"{key}={value}" for key, value in env_vars.items()]
         else:  # dotenv
-            for key, value in env_vars.items():
-                escaped = value.replace('"', '\\"')
-                click.echo(f'{key}="{escaped}"')
+            lines = [f'{key}="{_dotenv_escape(value)}"' for key, value in env_vars.items()]
+        if lines:
+            click.echo("\n".join(lines))
     
     except TierError as e:
         click.echo(f"# Error: {e}", err=True)
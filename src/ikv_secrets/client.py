@@ -4,6 +4,7 @@ IronKeyVault API client for fetching secrets.
 
 from __future__ import annotations
 
+import functools
 import hashlib
 import hmac
 import os
@@ -12,7 +13,11 @@ from typing import Any, Optional
 
 import httpx
 
-from ikv_secrets.keyring_store import get_token, TokenInfo
+from ikv_secrets.auth import ensure_fresh_token, refresh_at
+from ikv_secrets.cache import get_cached_env, parse_max_age, set_cached_env
+from ikv_secrets.jsonlib import loads
+from ikv_secrets.keyring_store import TokenInfo
+from ikv_secrets.transport import get_http_client, new_async_http_client
 
 
 class IKVClientError(Exception):
@@ -61,8 +66,15 @@ class IKVClient:
         self._api_key = api_key
         self._master_key = master_key
         self._token: Optional[TokenInfo] = None
-        # verify=False allows self-signed certs for localhost/dev
-        self._http = httpx.Client(timeout=30.0, verify=False)
+        # Bearer headers and the expiry of the token they carry
+        self._cached_headers: Optional[tuple[dict[str, str], float]] = None
+        # Records fetched with a service account are only cached in memory
+        self._cache_on_disk = not (api_key and master_key)
+        # Service-account signing: keyed HMAC prepared once, copied per request
+        self._hmac_template = hmac.new((api_key or "").encode(), digestmod=hashlib.sha256)
+        self._tenant_bytes = tenant.encode()
+        # Pooled per vault URL, so connections outlive this instance
+        self._http = get_http_client(self.vault_url)
     
     @classmethod
     def from_env(cls) -> "IKVClient":
@@ -79,38 +91,48 @@ class IKVClient:
                 "IKV_TENANT not set. Run 'ikv-secrets login --tenant <name>' first."
             )
         
+        api_key = os.environ.get("IKV_API_KEY")
+        master_key = os.environ.get("IKV_MASTER_KEY")
+        
+        # Interactive clients are shared; credentials are never cached
+        if cls is IKVClient and not (api_key or master_key):
+            return _get_client(vault_url.rstrip("/"), tenant)
+        
         return cls(
             vault_url=vault_url,
             tenant=tenant,
-            api_key=os.environ.get("IKV_API_KEY"),
-            master_key=os.environ.get("IKV_MASTER_KEY"),
+            api_key=api_key,
+            master_key=master_key,
         )
     
     def _get_auth_headers(self) -> dict[str, str]:
         """Get authentication headers for API requests."""
         # Service account mode (CI/CD)
         if self._api_key and self._master_key:
-            timestamp = str(int(time.time()))
+            timestamp = int(time.time())
             nonce = os.urandom(16).hex()
             
-            # Create signature
-            message = f"{timestamp}:{nonce}:{self.tenant}"
-            signature = hmac.new(
-                self._api_key.encode(),
-                message.encode(),
-                hashlib.sha256
-            ).hexdigest()
+            # Create signature over "timestamp:nonce:tenant"
+            mac = self._hmac_template.copy()
+            mac.update(b"%d:%s:%s" % (timestamp, nonce.encode(), self._tenant_bytes))
+            signature = mac.hexdigest()
             
             return {
                 "X-API-Key": self._api_key,
                 "X-Master-Key": self._master_key,
-                "X-Timestamp": timestamp,
+                "X-Timestamp": str(timestamp),
                 "X-Nonce": nonce,
                 "X-Signature": signature,
             }
         
-        # Interactive mode (token from keyring)
-        token = get_token(self.tenant)
+        # Interactive mode: reuse headers until the token is due for refresh,
+        # so ensure_fresh_token still renews it ahead of expiry
+        cached = self._cached_headers
+        if cached is not None and time.time() < cached[1]:
+            return cached[0]
+        
+        # Token from keyring, renewed first if it is about to expire
+        token = ensure_fresh_token(self.tenant, self.vault_url)
         if not token:
             raise AuthenticationError(
                 f"Not logged in to tenant '{self.tenant}'. "
@@ -123,45 +145,168 @@ class IKVClient:
                 f"Run 'ikv-secrets login --tenant {self.tenant}' to re-authenticate."
             )
         
-        return {
+        headers = {
             "Authorization": f"Bearer {token.access_token}",
         }
+        self._token = token
+        self._cached_headers = (headers, refresh_at(token))
+        return headers
+    
+    def _cache_key(self) -> Optional[str]:
+        """
+        Get the credential that keys the record cache.
+        
+        Call after _get_auth_headers() so it matches the credential the
+        request is sent with.
+        """
+        if self._api_key and self._master_key:
+            return f"{self._api_key}\0{self._master_key}"
+        return self._token.access_token if self._token else None
     
     def get_env(self, record_id: str) -> dict[str, str]:
         """
         Fetch environment variables from a record.
         
+        Records are served from cache while the vault's Cache-Control
+        max-age allows it.
+        
         Args:
             record_id: Record ID or name
             
         Returns:
             Dictionary of environment variable name -> value
         """
+        # Authenticate first, so a cache hit still requires valid credentials
         headers = self._get_auth_headers()
+        cache_key = self._cache_key()
+        cached = get_cached_env(
+            self.vault_url, self.tenant, record_id, cache_key, self._cache_on_disk
+        )
+        if cached is not None:
+            return cached
         
         response = self._http.get(
-            f"{self.vault_url}/api/v1/env/{record_id}",
+            f"/api/v1/env/{record_id}",
             headers=headers,
         )
+        return self._handle_env_response(record_id, response, cache_key)
+    
+    def get_envs(self, records: list[str]) -> dict[str, dict[str, str]]:
+        """
+        Fetch environment variables from several records in one request.
+        
+        Falls back to concurrent per-record requests when the vault does
+        not support batch fetches.
+        
+        Args:
+            records: Record IDs or names
+            
+        Returns:
+            Dictionary of record -> (environment variable name -> value)
+        """
+        headers = self._get_auth_headers()
+        cache_key = self._cache_key()
+        result: dict[str, dict[str, str]] = {}
+        missing: list[str] = []
+        
+        for record_id in dict.fromkeys(records):
+            cached = get_cached_env(
+                self.vault_url, self.tenant, record_id, cache_key, self._cache_on_disk
+            )
+            if cached is not None:
+                result[record_id] = cached
+            else:
+                missing.append(record_id)
+        
+        if missing:
+            response = self._http.post(
+                "/api/v1/env/batch",
+                json={"records": missing},
+                headers=headers,
+            )
+            if response.status_code == 404:
+                result.update(self._get_envs_concurrently(missing, cache_key))
+            else:
+                self._check_response(response)
+                ttl = parse_max_age(response.headers.get("cache-control"))
+                fetched = loads(response.content).get("records", {})
+                for record_id in missing:
+                    if record_id not in fetched:
+                        raise IKVClientError(f"Env record '{record_id}' not found")
+                    variables = fetched[record_id].get("variables", {})
+                    if ttl:
+                        set_cached_env(
+                            self.vault_url, self.tenant, record_id, variables, ttl,
+                            cache_key, self._cache_on_disk,
+                        )
+                    result[record_id] = variables
+        
+        return {record_id: result[record_id] for record_id in records}
+    
+    def _get_envs_concurrently(
+        self, records: list[str], cache_key: Optional[str]
+    ) -> dict[str, dict[str, str]]:
+        """Fetch records with one request each, issued concurrently."""
+        import asyncio  # Deferred: only multi-record fetches need it
         
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self._get_envs_async(records, cache_key))
+        
+        # Already inside an event loop (e.g. Jupyter) - fetch sequentially
+        return {record_id: self.get_env(record_id) for record_id in records}
+    
+    async def _get_envs_async(
+        self, records: list[str], cache_key: Optional[str]
+    ) -> dict[str, dict[str, str]]:
+        """Fetch records concurrently over one async client."""
+        import asyncio
+        
+        async with new_async_http_client(self.vault_url) as http:
+            responses = await asyncio.gather(*(
+                http.get(f"/api/v1/env/{record_id}", headers=self._get_auth_headers())
+                for record_id in records
+            ))
+        
+        return {
+            record_id: self._handle_env_response(record_id, response, cache_key)
+            for record_id, response in zip(records, responses)
+        }
+    
+    def _handle_env_response(
+        self, record_id: str, response: httpx.Response, cache_key: Optional[str]
+    ) -> dict[str, str]:
+        """Check a single-record response, cache it and return its variables."""
+        if response.status_code == 404:
+            raise IKVClientError(f"Env record '{record_id}' not found")
+        
+        self._check_response(response)
+        
+        variables: dict[str, str] = loads(response.content).get("variables", {})
+        ttl = parse_max_age(response.headers.get("cache-control"))
+        if ttl:
+            set_cached_env(
+                self.vault_url, self.tenant, record_id, variables, ttl,
+                cache_key, self._cache_on_disk,
+            )
+        return variables
+    
+    def _check_response(self, response: httpx.Response) -> None:
+        """Raise the matching client error for a failed response."""
         if response.status_code == 401:
+            self._cached_headers = None
             raise AuthenticationError("Authentication failed. Please login again.")
         
         if response.status_code == 403:
-            data = response.json()
+            data = loads(response.content)
             raise TierError(
                 data.get("error", "Feature requires higher tier"),
                 required_tier=data.get("required_tier", "premium"),
                 current_tier=data.get("current_tier", "unknown"),
             )
         
-        if response.status_code == 404:
-            raise IKVClientError(f"Env record '{record_id}' not found")
-        
         response.raise_for_status()
-        
-        data = response.json()
-        return data.get("variables", {})
     
     def list_env_records(self) -> list[dict[str, Any]]:
         """
@@ -173,19 +318,38 @@ class IKVClient:
         headers = self._get_auth_headers()
         
         response = self._http.get(
-            f"{self.vault_url}/api/v1/env",
+            "/api/v1/env",
             headers=headers,
         )
         
         response.raise_for_status()
-        return response.json().get("records", [])
+        return loads(response.content).get("records", [])
     
     def close(self) -> None:
-        """Close the HTTP client."""
-        self._http.close()
+        """
+        Release the client.
+        
+        The underlying connection pool is shared with other clients for the
+        same vault and is closed at interpreter exit, so this is a no-op.
+        """
     
     def __enter__(self) -> "IKVClient":
         return self
     
     def __exit__(self, *args: Any) -> None:
         self.close()
+
+
+@functools.lru_cache(maxsize=8)
+def _get_client(vault_url: str, tenant: str) -> IKVClient:
+    """
+    Get the shared interactive-mode client for a vault and tenant.
+    
+    Args:
+        vault_url: Vault URL
+        tenant: Tenant name
+        
+    Returns:
+        IKVClient created on first use
+    """
+    return IKVClient(vault_url=vault_url, tenant=tenant)
@@ -4,11 +4,17 @@ Configuration management for ikv-secrets.
 
 from __future__ import annotations
 
-import os
+import copy
+import sys
 from pathlib import Path
 from typing import Any, Optional
 
-import yaml
+from ikv_secrets.fsutil import write_private
+from ikv_secrets.jsonlib import dumps, loads
+
+
+# Parsed config keyed by (st_mtime_ns, st_size) of the file it came from
+_CONFIG_CACHE: Optional[tuple[tuple[int, int], dict[str, Any]]] = None
 
 
 def get_config_dir() -> Path:
@@ -20,65 +26,191 @@ def get_config_dir() -> Path:
 
 def get_config_path() -> Path:
     """Get the config file path."""
-    return get_config_dir() / "config.yaml"
+    return get_config_dir() / "config.json"
 
 
-def get_config() -> dict[str, Any]:
+def _legacy_scalar(text: str) -> Any:
+    """Parse a scalar from a legacy config.yaml line."""
+    if text[0] == "'":
+        if len(text) < 2 or not text.endswith("'"):
+            raise ValueError(text)
+        return text[1:-1].replace("''", "'")
+    if text[0] == '"':
+        return loads(text)
+    
+    text = text.split(" #", 1)[0].rstrip()
+    if text == "{}":
+        return {}
+    if text[0] in "[{|>&*!-%@`":
+        raise ValueError(text)  # Flow/block collections, anchors, tags
+    
+    lowered = text.lower()
+    if lowered in ("true", "yes", "on"):
+        return True
+    if lowered in ("false", "no", "off"):
+        return False
+    if lowered in ("null", "~"):
+        return None
+    return int(text) if text.isdigit() else text
+
+
+def _parse_legacy_yaml(text: str) -> dict[str, Any]:
     """
-    Load configuration from ~/.ikv/config.yaml.
+    Parse the YAML subset older releases wrote to config.yaml.
+    
+    That is nested block mappings of scalars, e.g. ``tenants: {name: {url,
+    default_record}}``; anything else raises ValueError.
+    """
+    root: dict[str, Any] = {}
+    stack: list[tuple[int, dict[str, Any]]] = [(-1, root)]
+    
+    for line in text.splitlines():
+        stripped = line.strip()
+        if not stripped or stripped.startswith("#") or stripped == "---":
+            continue
+        
+        key, sep, value = stripped.partition(":")
+        if not sep or (value and not value.startswith(" ")) or "\t" in line:
+            raise ValueError(line)
+        
+        indent = len(line) - len(line.lstrip(" "))
+        while stack[-1][0] >= indent:
+            stack.pop()
+        parent = stack[-1][1]
+        
+        key = str(_legacy_scalar(key.strip()))
+        value = value.strip()
+        if not value or value.startswith("#"):
+            child: dict[str, Any] = {}
+            parent[key] = child
+            stack.append((indent, child))
+        else:
+            parent[key] = _legacy_scalar(value)
+    
+    return root
+
+
+def _migrate_legacy_config(config_path: Path) -> bool:
+    """
+    Convert a config.yaml from older releases to config.json.
+    
+    Uses PyYAML when it is installed and the built-in parser for the
+    format older releases wrote otherwise. A file neither can read is left
+    alone with a warning on stderr.
     
     Returns:
-        Configuration dictionary
+        True if a legacy config was migrated
+    """
+    legacy_path = config_path.with_name("config.yaml")
+    if not legacy_path.exists():
+        return False
+    
+    text = legacy_path.read_text()
+    try:
+        import yaml
+    except ImportError:
+        try:
+            config = _parse_legacy_yaml(text)
+        except ValueError:
+            print(
+                f"⚠️  Could not convert {legacy_path} to JSON. "
+                f"Run 'pip install pyyaml' so it can be migrated.",
+                file=sys.stderr,
+            )
+            return False
+    else:
+        config = yaml.safe_load(text) or {}
+    
+    save_config(config)
+    legacy_path.unlink()
+    return True
+
+
+def _cached_config() -> dict[str, Any]:
     """
+    Load configuration, reusing the parse while the file is unchanged.
+    
+    The returned dict is the cached one and must not be modified.
+    """
+    global _CONFIG_CACHE
     config_path = get_config_path()
     
-    if not config_path.exists():
-        return {"tenants": {}}
+    try:
+        stat = config_path.stat()
+    except FileNotFoundError:
+        if not _migrate_legacy_config(config_path):
+            return {"tenants": {}}
+        stat = config_path.stat()
     
-    with open(config_path) as f:
-        config = yaml.safe_load(f) or {}
+    key = (stat.st_mtime_ns, stat.st_size)
+    if _CONFIG_CACHE is not None and _CONFIG_CACHE[0] == key:
+        return _CONFIG_CACHE[1]
     
+    data = config_path.read_bytes()
+    config = (loads(data) if data.strip() else None) or {}
+    
+    _CONFIG_CACHE = (key, config)
     return config
 
 
-def save_config(config: dict[str, Any]) -> None:
+def get_config() -> dict[str, Any]:
     """
-    Save configuration to ~/.ikv/config.yaml.
+    Load configuration from ~/.ikv/config.json.
     
-    Args:
-        config: Configuration dictionary
+    The parsed file is cached until it changes on disk; callers get their
+    own copy, so changing it does not affect the cache.
+    
+    Returns:
+        Configuration dictionary
     """
+    return copy.deepcopy(_cached_config())
+
+
+def _write_config(config: dict[str, Any]) -> None:
+    """Write config and make it the cached config (only once it is on disk)."""
+    global _CONFIG_CACHE
     config_path = get_config_path()
     
-    with open(config_path, "w") as f:
-        yaml.dump(config, f, default_flow_style=False)
+    # Written atomically and created with secure permissions; stays
+    # indented since users edit it by hand
+    write_private(config_path, dumps(config, indent=True))
     
-    # Secure permissions
-    os.chmod(config_path, 0o600)
+    # What we just wrote is current; keep it so the next read skips the parse
+    stat = config_path.stat()
+    _CONFIG_CACHE = ((stat.st_mtime_ns, stat.st_size), config)
+
+
+def save_config(config: dict[str, Any]) -> None:
+    """
+    Save configuration to ~/.ikv/config.json.
+    
+    Args:
+        config: Configuration dictionary
+    """
+    _write_config(copy.deepcopy(config))
 
 
 def save_tenant_config(tenant: str, vault_url: str, default_record: Optional[str] = None) -> None:
     """
     Save tenant-specific configuration.
     
+    Builds an updated copy of the cached config, writes it once, and only
+    then makes it the cached config.
+    
     Args:
         tenant: Tenant name
         vault_url: Vault URL
         default_record: Default env record (optional)
     """
-    config = get_config()
-    
-    if "tenants" not in config:
-        config["tenants"] = {}
-    
-    config["tenants"][tenant] = {
-        "url": vault_url,
-    }
-    
+    current = _cached_config()
+    tenant_config = {"url": vault_url}
     if default_record:
-        config["tenants"][tenant]["default_record"] = default_record
+        tenant_config["default_record"] = default_record
     
-    save_config(config)
+    _write_config({
+        **current,
+        "tenants": {**current.get("tenants", {}), tenant: tenant_config},
+    })
 
 
 def get_tenant_url(tenant: str) -> Optional[str]:
@@ -91,5 +223,5 @@ def get_tenant_url(tenant: str) -> Optional[str]:
     Returns:
         Vault URL or None
     """
-    config = get_config()
+    config = _cached_config()
     return config.get("tenants", {}).get(tenant, {}).get("url")
@@ -5,9 +5,54 @@ Environment variable proxy for lazy-loading secrets from IronKeyVault.
 from __future__ import annotations
 
 import os
-from typing import Any, Optional
+from typing import TYPE_CHECKING, Any, Optional
 
-from ikv_secrets.client import IKVClient
+if TYPE_CHECKING:
+    from ikv_secrets.client import IKVClient
+
+
+# Characters backslash-escaped inside double quotes (backslash must come first)
+_DOTENV_SPECIAL = ("\\", '"')
+_SHELL_SPECIAL = ("\\", '"', "$", "`")
+
+
+# Escaping uses str.replace behind an `in` check: measured faster than a
+# precompiled re.sub for plain, JWT/JSON-like and quote-heavy values alike
+def _escape(value: str, special: tuple[str, ...]) -> str:
+    """Backslash-escape special characters; values without any are returned as is."""
+    for char in special:
+        if char in value:
+            break
+    else:
+        return value
+    for char in special:
+        value = value.replace(char, "\\" + char)
+    return value
+
+
+def _dotenv_escape(value: str) -> str:
+    """Escape a value for a double-quoted .env entry."""
+    return _escape(value, _DOTENV_SPECIAL)
+
+
+def _shell_escape(value: str) -> str:
+    """Escape a value for a double-quoted shell word."""
+    return _escape(value, _SHELL_SPECIAL)
+
+
+class _LazyAttrError(AttributeError):
+    """AttributeError for a missing variable, formatted only when shown."""
+    
+    def __init__(self, name: str, available: tuple[str, ...]) -> None:
+        super().__init__(name, available)  # Both args, so it pickles
+        self.var_name = name
+        self.available = available
+    
+    def __str__(self) -> str:
+        return (
+            f"Environment variable '{self.var_name}' not found. "
+            f"Available: {', '.join(self.available) or '(none loaded)'}"
+        )
 
 
 class EnvProxy:
@@ -33,10 +78,13 @@ class EnvProxy:
         self._cache: dict[str, str] = {}
         self._loaded: bool = False
         self._record_id: Optional[str] = None
+        self._keys: Optional[tuple[str, ...]] = None
     
     def _ensure_client(self) -> IKVClient:
         """Get or create the IKV client."""
         if self._client is None:
+            # Deferred so `from ikv_secrets import env` does not load httpx
+            from ikv_secrets.client import IKVClient
             self._client = IKVClient.from_env()
         return self._client
     
@@ -60,6 +108,7 @@ class EnvProxy:
         """
         client = self._ensure_client()
         self._cache = client.get_env(record_id)
+        self._keys = None
         self._record_id = record_id
         self._loaded = True
         
@@ -76,10 +125,12 @@ class EnvProxy:
         self._ensure_loaded()
         return key in self._cache
     
-    def keys(self) -> list[str]:
+    def keys(self) -> tuple[str, ...]:
         """Get all available environment variable names."""
         self._ensure_loaded()
-        return list(self._cache.keys())
+        if self._keys is None:
+            self._keys = tuple(self._cache)
+        return self._keys
     
     def to_dict(self) -> dict[str, str]:
         """Export all variables as a dictionary."""
@@ -89,18 +140,21 @@ class EnvProxy:
     def to_dotenv(self) -> str:
         """Export as .env file format."""
         self._ensure_loaded()
-        lines = [f'{k}="{v}"' for k, v in self._cache.items()]
-        return "\n".join(lines)
+        return "\n".join([f'{k}="{_dotenv_escape(v)}"' for k, v in self._cache.items()])
+    
+    def to_dotenv_bytes(self) -> bytes:
+        """Export as UTF-8 encoded .env file content (for binary streams)."""
+        return self.to_dotenv().encode()
     
     def to_shell(self) -> str:
         """Export as shell export commands."""
         self._ensure_loaded()
-        lines = [f'export {k}="{v}"' for k, v in self._cache.items()]
-        return "\n".join(lines)
+        return "\n".join([f'export {k}="{_shell_escape(v)}"' for k, v in self._cache.items()])
     
     def clear(self) -> None:
         """Clear cached secrets from memory."""
         self._cache.clear()
+        self._keys = None
         self._loaded = False
         self._record_id = None
     
@@ -111,13 +165,11 @@ class EnvProxy:
         
         self._ensure_loaded()
         
-        if name not in self._cache:
-            raise AttributeError(
-                f"Environment variable '{name}' not found. "
-                f"Available: {', '.join(self._cache.keys()) or '(none loaded)'}"
-            )
-        
-        return self._cache[name]
+        try:
+            return self._cache[name]
+        except KeyError:
+            # Message is built lazily: hasattr() discards it unread
+            raise _LazyAttrError(name, self.keys()) from None
     
     def __repr__(self) -> str:
         status = "loaded" if self._loaded else "not loaded"
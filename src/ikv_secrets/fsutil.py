@@ -0,0 +1,36 @@
+"""
+File helpers for the token, config and cache files.
+"""
+
+from __future__ import annotations
+
+import os
+import tempfile
+from pathlib import Path
+
+
+def write_private(path: Path, data: bytes) -> None:
+    """
+    Atomically replace a file with data readable only by its owner.
+
+    The data goes to a uniquely named temp file in the same directory
+    (created 0600 by mkstemp), is fsynced, and is then renamed over path,
+    so readers see either the old or the new content, never a partial one.
+
+    Args:
+        path: File to write
+        data: New file content
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
@@ -4,29 +4,37 @@ Secure token storage using OS keyring with file fallback.
 
 from __future__ import annotations
 
-import json
-import os
 import time
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Optional
+from typing import Iterable, Optional
+
+from ikv_secrets.fsutil import write_private
+from ikv_secrets.jsonlib import dumps, loads
 
 try:
     import keyring
-    from keyring.errors import NoKeyringError
+    from keyring.errors import KeyringError, NoKeyringError
     KEYRING_AVAILABLE = True
 except ImportError:
     KEYRING_AVAILABLE = False
-    NoKeyringError = Exception
+    KeyringError = NoKeyringError = Exception
 
 
 KEYRING_SERVICE = "ikv-secrets"
 CONFIG_DIR = Path.home() / ".config" / "ikv-secrets"
 TOKENS_FILE = CONFIG_DIR / "tokens.json"
 
+# Tokens count as expired this many seconds before their expiry time
+EXPIRY_BUFFER = 300
 
-def _use_file_fallback() -> bool:
-    """Check if we need to use file fallback instead of keyring."""
+
+# Result of the keyring probe (None = not probed yet)
+_FALLBACK_CACHE: Optional[bool] = None
+
+
+def _probe_keyring() -> bool:
+    """Probe the keyring backend; True if the file fallback is needed."""
     if not KEYRING_AVAILABLE:
         return True
     try:
@@ -35,26 +43,39 @@ def _use_file_fallback() -> bool:
         # Try a test operation
         keyring.get_password(KEYRING_SERVICE, "__test__")
         return False
-    except (NoKeyringError, RuntimeError, Exception):
+    except (NoKeyringError, KeyringError, RuntimeError, OSError):
+        # No backend, a locked/broken backend, or no D-Bus session
         return True
 
 
+def _use_file_fallback() -> bool:
+    """Check if we need to use file fallback instead of keyring (probed once)."""
+    global _FALLBACK_CACHE
+    if _FALLBACK_CACHE is None:
+        _FALLBACK_CACHE = _probe_keyring()
+    return _FALLBACK_CACHE
+
+
+def _reset_fallback_cache() -> None:
+    """Forget the keyring probe result (for tests)."""
+    global _FALLBACK_CACHE
+    _FALLBACK_CACHE = None
+
+
 def _load_tokens_file() -> dict:
     """Load tokens from file."""
     if TOKENS_FILE.exists():
         try:
-            return json.loads(TOKENS_FILE.read_text())
-        except (json.JSONDecodeError, IOError):
+            return loads(TOKENS_FILE.read_bytes())
+        except (ValueError, IOError):
             pass
     return {}
 
 
 def _save_tokens_file(tokens: dict) -> None:
-    """Save tokens to file."""
+    """Save tokens to file (atomically, created with 0600 permissions)."""
     CONFIG_DIR.mkdir(parents=True, exist_ok=True)
-    TOKENS_FILE.write_text(json.dumps(tokens, indent=2))
-    # Secure permissions
-    os.chmod(TOKENS_FILE, 0o600)
+    write_private(TOKENS_FILE, dumps(tokens))
 
 
 @dataclass
@@ -63,33 +84,79 @@ class TokenInfo:
     access_token: str
     expires_at: int  # Unix timestamp
     tenant: str
+    refresh_token: Optional[str] = None
+    refresh_expires_at: int = 0  # Unix timestamp, 0 = unknown
+    issued_at: int = 0  # Unix timestamp, 0 = unknown
+    _expired_cache: Optional[tuple[float, bool]] = field(
+        default=None, init=False, repr=False, compare=False
+    )
     
     @property
     def is_expired(self) -> bool:
-        """Check if token is expired (with 5 min buffer)."""
-        return time.time() > (self.expires_at - 300)
+        """
+        Check if token is expired (with EXPIRY_BUFFER).
+        
+        The answer is reused for up to a second of monotonic time, so
+        repeated checks neither re-read the clock nor flip on clock jumps.
+        """
+        now = time.monotonic()
+        cached = self._expired_cache
+        if cached is not None and now - cached[0] < 1.0:
+            return cached[1]
+        
+        expired = time.time() > (self.expires_at - EXPIRY_BUFFER)
+        self._expired_cache = (now, expired)
+        return expired
+    
+    def is_near_expiry(self, slack_seconds: float) -> bool:
+        """Check if token expires within slack_seconds."""
+        return time.time() > (self.expires_at - slack_seconds)
     
     @property
     def expires_in(self) -> int:
         """Seconds until expiration."""
         return max(0, self.expires_at - int(time.time()))
     
-    def to_json(self) -> str:
-        """Serialize to JSON for storage."""
-        return json.dumps({
+    def expiry_view(self) -> tuple[bool, int]:
+        """
+        Get is_expired and expires_in from a single clock read.
+        
+        Returns:
+            (expired with EXPIRY_BUFFER, seconds until expiration)
+        """
+        now = int(time.time())
+        return now > self.expires_at - EXPIRY_BUFFER, max(0, self.expires_at - now)
+    
+    def to_dict(self) -> dict:
+        """Convert to a plain dict for storage."""
+        return {
             "access_token": self.access_token,
             "expires_at": self.expires_at,
             "tenant": self.tenant,
-        })
+            "refresh_token": self.refresh_token,
+            "refresh_expires_at": self.refresh_expires_at,
+            "issued_at": self.issued_at,
+        }
+    
+    def to_json(self) -> str:
+        """Serialize to JSON for storage."""
+        return dumps(self.to_dict()).decode()
     
     @classmethod
     def from_json(cls, data: str) -> "TokenInfo":
         """Deserialize from JSON."""
-        obj = json.loads(data)
+        return cls.from_dict(loads(data))
+    
+    @classmethod
+    def from_dict(cls, obj: dict) -> "TokenInfo":
+        """Build from a stored dict (fields added later are optional)."""
         return cls(
             access_token=obj["access_token"],
             expires_at=obj["expires_at"],
             tenant=obj["tenant"],
+            refresh_token=obj.get("refresh_token"),
+            refresh_expires_at=obj.get("refresh_expires_at", 0),
+            issued_at=obj.get("issued_at", 0),
         )
 
 
@@ -111,12 +178,46 @@ def get_token(tenant: str) -> Optional[TokenInfo]:
             data = keyring.get_password(KEYRING_SERVICE, tenant)
         
         if data:
-            return TokenInfo.from_json(data) if isinstance(data, str) else TokenInfo.from_json(json.dumps(data))
+            return TokenInfo.from_json(data) if isinstance(data, str) else TokenInfo.from_dict(data)
     except Exception:
         pass
     return None
 
 
+def get_all_tokens(tenants: Iterable[str]) -> dict[str, TokenInfo]:
+    """
+    Retrieve tokens for several tenants at once.
+    
+    With the file fallback the tokens file is read a single time; the OS
+    keyring has no bulk read, so it is queried per tenant.
+    
+    Args:
+        tenants: Tenant names
+        
+    Returns:
+        Tenant name -> TokenInfo for tenants that have a token
+    """
+    if not _use_file_fallback():
+        tokens = {}
+        for tenant in tenants:
+            token = get_token(tenant)
+            if token:
+                tokens[tenant] = token
+        return tokens
+    
+    stored = _load_tokens_file()
+    tokens = {}
+    for tenant in tenants:
+        data = stored.get(tenant)
+        if not data:
+            continue
+        try:
+            tokens[tenant] = TokenInfo.from_dict(data)
+        except Exception:
+            pass
+    return tokens
+
+
 def save_token(tenant: str, token: TokenInfo) -> None:
     """
     Save token to OS keyring or file fallback.
@@ -127,7 +228,7 @@ def save_token(tenant: str, token: TokenInfo) -> None:
     """
     if _use_file_fallback():
         tokens = _load_tokens_file()
-        tokens[tenant] = json.loads(token.to_json())
+        tokens[tenant] = token.to_dict()
         _save_tokens_file(tokens)
     else:
         keyring.set_password(KEYRING_SERVICE, tenant, token.to_json())
@@ -0,0 +1,126 @@
+"""
+Shared HTTP connection pool for IronKeyVault requests.
+
+Login, token exchange and API calls against the same vault reuse one
+keep-alive connection instead of paying a TCP + TLS handshake per request.
+Clients speak HTTP/2, so concurrent requests are multiplexed over that one
+connection.
+"""
+
+from __future__ import annotations
+
+import atexit
+import functools
+import os
+import ssl
+import threading
+import urllib.parse
+
+import httpx
+
+
+_POOL_LIMITS = httpx.Limits(
+    max_keepalive_connections=10,
+    max_connections=20,
+    keepalive_expiry=30.0,
+)
+
+_CLIENTS: dict[str, httpx.Client] = {}
+_CLIENTS_LOCK = threading.Lock()
+
+
+# Vaults on these hosts are local dev instances with self-signed certs
+_LOCAL_HOSTS = frozenset(("localhost", "127.0.0.1", "::1"))
+
+
+@functools.lru_cache(maxsize=2)
+def _ssl_context(verify: bool) -> ssl.SSLContext:
+    """Build (once) the SSL context shared by all vault connections."""
+    if verify:
+        import certifi
+        ctx = ssl.create_default_context(cafile=os.environ.get("SSL_CERT_FILE") or certifi.where())
+    else:
+        ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+        ctx.check_hostname = False
+        ctx.verify_mode = ssl.CERT_NONE
+    ctx.minimum_version = ssl.TLSVersion.TLSv1_2
+    return ctx
+
+
+def _verify_for(vault_url: str) -> ssl.SSLContext:
+    """
+    Get the SSL context for a vault URL.
+
+    Certificates are verified except for local hosts, or when
+    IKV_VERIFY_SSL is set to false (development only).
+    """
+    host = urllib.parse.urlsplit(vault_url).hostname or ""
+    verify = (
+        host not in _LOCAL_HOSTS
+        and os.environ.get("IKV_VERIFY_SSL", "true").lower() not in ("0", "false", "no")
+    )
+    return _ssl_context(verify)
+
+
+def get_http_client(vault_url: str) -> httpx.Client:
+    """
+    Get the shared HTTP client for a vault.
+
+    Clients are created lazily, keyed by vault URL, and closed at exit.
+
+    Args:
+        vault_url: Vault URL (used as the client's base URL)
+
+    Returns:
+        Pooled httpx.Client
+    """
+    vault_url = vault_url.rstrip("/")
+    client = _CLIENTS.get(vault_url)
+    if client is not None:
+        return client
+
+    with _CLIENTS_LOCK:
+        client = _CLIENTS.get(vault_url)
+        if client is None:
+            client = httpx.Client(
+                base_url=vault_url,
+                verify=_verify_for(vault_url),
+                http2=True,
+                limits=_POOL_LIMITS,
+                timeout=30.0,
+            )
+            _CLIENTS[vault_url] = client
+        return client
+
+
+def new_async_http_client(vault_url: str) -> httpx.AsyncClient:
+    """
+    Create an async HTTP client for a vault.
+
+    Async clients are bound to an event loop, so they are not pooled; use
+    the result as an ``async with`` context manager.
+
+    Args:
+        vault_url: Vault URL (used as the client's base URL)
+
+    Returns:
+        New httpx.AsyncClient
+    """
+    vault_url = vault_url.rstrip("/")
+    return httpx.AsyncClient(
+        base_url=vault_url,
+        verify=_verify_for(vault_url),
+        http2=True,
+        timeout=30.0,
+    )
+
+
+def close_http_clients() -> None:
+    """Close all pooled HTTP clients."""
+    with _CLIENTS_LOCK:
+        for client in _CLIENTS.values():
+            client.close()
+        _CLIENTS.clear()
+
+
+atexit.register(close_http_clients)
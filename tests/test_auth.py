@@ -0,0 +1,255 @@
+"""Tests for the browser login callback."""
+
+import json
+import socket
+import threading
+import time
+import types
+
+import httpx
+import pytest
+
+from ikv_secrets import auth
+from ikv_secrets.auth import _scan_query, _wait_for_callback
+from ikv_secrets.keyring_store import TokenInfo
+
+
+VAULT_URL = "https://vault.test"
+
+
+class TestScanQuery:
+    """Tests for callback query parsing."""
+    
+    def test_code_and_state(self):
+        """Test code and state are decoded."""
+        assert _scan_query("/callback?code=a%2Bb+c&state=xyz") == {"code": "a+b c", "state": "xyz"}
+    
+    def test_ignores_unknown_and_blank(self):
+        """Test unrelated and empty parameters are skipped."""
+        assert _scan_query("/callback?foo=1&error=denied&error_description=") == {"error": "denied"}
+    
+    def test_first_value_wins(self):
+        """Test repeated parameters keep the first value."""
+        assert _scan_query("/callback?code=first&code=second") == {"code": "first"}
+    
+    def test_no_query(self):
+        """Test paths without a query."""
+        assert _scan_query("/favicon.ico") == {}
+
+
+class TestWaitForCallback:
+    """Tests for the one-shot callback server."""
+    
+    def _serve(self, *paths):
+        """Run the callback server while a fake browser requests paths."""
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.bind(("127.0.0.1", 0))
+        server.listen(1)
+        port = server.getsockname()[1]
+        responses = []
+        
+        def browser():
+            for path in paths:
+                responses.append(httpx.get(f"http://127.0.0.1:{port}{path}"))
+        
+        thread = threading.Thread(target=browser)
+        thread.start()
+        try:
+            result = _wait_for_callback(server, timeout=5)
+        finally:
+            thread.join()
+            server.close()
+        return result, responses
+    
+    def test_receives_code(self):
+        """Test unrelated requests are skipped until the code arrives."""
+        result, responses = self._serve("/favicon.ico", "/callback?code=abc&state=s1")
+        
+        assert result == {"code": "abc", "state": "s1"}
+        assert [r.status_code for r in responses] == [404, 200]
+    
+    def test_error_is_escaped(self):
+        """Test error descriptions are returned and HTML-escaped in the page."""
+        result, responses = self._serve("/callback?error=x&error_description=%3Cb%3Eno")
+        
+        assert result == {"error": "<b>no"}
+        assert responses[0].status_code == 400
+        assert "&lt;b&gt;no" in responses[0].text
+    
+    def test_large_request_gets_full_response(self):
+        """Test unread request bytes do not reset the connection."""
+        result, responses = self._serve_raw(
+            b"GET /callback?code=abc HTTP/1.1\r\nHost: x\r\nX-Pad: "
+            + b"a" * 16384
+            + b"\r\n\r\n"
+        )
+        
+        assert result["code"] == "abc"
+        assert responses[0].startswith(b"HTTP/1.1 200 OK")
+        assert responses[0].endswith(b"</script>")
+    
+    def _serve_raw(self, request):
+        """Run the callback server against a raw request."""
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.bind(("127.0.0.1", 0))
+        server.listen(1)
+        port = server.getsockname()[1]
+        responses = []
+        
+        def browser():
+            with socket.create_connection(("127.0.0.1", port)) as conn:
+                conn.sendall(request)
+                chunks = []
+                while True:
+                    chunk = conn.recv(4096)
+                    if not chunk:
+                        break
+                    chunks.append(chunk)
+                responses.append(b"".join(chunks))
+        
+        thread = threading.Thread(target=browser)
+        thread.start()
+        try:
+            result = _wait_for_callback(server, timeout=5)
+        finally:
+            thread.join()
+            server.close()
+        return result, responses
+    
+    def test_timeout(self):
+        """Test an empty result when nothing arrives."""
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.bind(("127.0.0.1", 0))
+        server.listen(1)
+        try:
+            assert _wait_for_callback(server, timeout=0.1) == {}
+        finally:
+            server.close()
+
+
+class TestEnsureFreshToken:
+    """Tests for refreshing the stored token."""
+    
+    @pytest.fixture
+    def vault(self, monkeypatch):
+        """Fake the token store, the vault and the terminal."""
+        state = {"token": None, "saved": [], "requests": [], "logins": [], "tty": False}
+        state["respond"] = lambda request: httpx.Response(500)
+        
+        def handler(request):
+            state["requests"].append(json.loads(request.content))
+            return state["respond"](request)
+        
+        client = httpx.Client(base_url=VAULT_URL, transport=httpx.MockTransport(handler))
+        monkeypatch.setattr(auth, "get_token", lambda tenant: state["token"])
+        
+        def save_token(tenant, token):
+            state["saved"].append(token)
+            state["token"] = token
+        
+        monkeypatch.setattr(auth, "save_token", save_token)
+        monkeypatch.setattr(auth, "get_http_client", lambda url: client)
+        monkeypatch.setattr(
+            auth, "_browser_login", lambda tenant, url: state["logins"].append(tenant) or "login"
+        )
+        terminal = types.SimpleNamespace(isatty=lambda: state["tty"])
+        monkeypatch.setattr(auth, "sys", types.SimpleNamespace(stdin=terminal, stdout=terminal))
+        return state
+    
+    def _token(self, expires_in):
+        """Build a stored token expiring in expires_in seconds."""
+        now = int(time.time())
+        return TokenInfo("old", now + expires_in, "acme", refresh_token="ref", issued_at=now - 3600)
+    
+    def test_not_logged_in(self, vault):
+        """Test None without a stored token."""
+        assert auth.ensure_fresh_token("acme", VAULT_URL) is None
+    
+    def test_fresh_token_not_refreshed(self, vault):
+        """Test tokens outside the refresh margin are returned as is."""
+        vault["token"] = self._token(auth.REFRESH_MARGIN + 600)
+        
+        assert auth.ensure_fresh_token("acme", VAULT_URL) is vault["token"]
+        assert vault["requests"] == []
+    
+    def test_refreshes_near_expiry(self, vault):
+        """Test a token inside the margin is refreshed and the refresh token kept."""
+        vault["token"] = self._token(auth.REFRESH_MARGIN - 60)
+        vault["respond"] = lambda request: httpx.Response(
+            200, json={"access_token": "new", "expires_in": 3600}
+        )
+        
+        token = auth.ensure_fresh_token("acme", VAULT_URL)
+        
+        assert token.access_token == "new"
+        assert token.refresh_token == "ref"
+        assert vault["saved"] == [token]
+        assert vault["requests"] == [{"refresh_token": "ref", "tenant": "acme"}]
+    
+    def test_rejected_refresh_logs_in_on_tty(self, vault):
+        """Test a 4xx falls back to browser login only with a terminal."""
+        vault["token"] = self._token(60)
+        vault["respond"] = lambda request: httpx.Response(401)
+        
+        assert auth.ensure_fresh_token("acme", VAULT_URL) is vault["token"]
+        assert vault["logins"] == []
+        
+        vault["tty"] = True
+        assert auth.ensure_fresh_token("acme", VAULT_URL) == "login"
+        assert vault["logins"] == ["acme"]
+    
+    @pytest.mark.parametrize("status", [408, 429, 503])
+    def test_transient_error_keeps_token(self, vault, status):
+        """Test rate limits and server errors never open a browser."""
+        vault["token"] = self._token(60)
+        vault["tty"] = True
+        vault["respond"] = lambda request: httpx.Response(status)
+        
+        assert auth.ensure_fresh_token("acme", VAULT_URL) is vault["token"]
+        assert vault["logins"] == []
+    
+    def test_concurrent_callers_refresh_once(self, vault):
+        """Test threads racing into the refresh margin share one refresh."""
+        vault["token"] = self._token(60)
+        entered = threading.Event()
+        
+        def respond(request):
+            entered.set()
+            time.sleep(0.1)  # Let the other thread queue up on the lock
+            return httpx.Response(200, json={"access_token": "new", "refresh_token": "ref2"})
+        
+        vault["respond"] = respond
+        results = []
+        
+        def call():
+            results.append(auth.ensure_fresh_token("acme", VAULT_URL))
+        
+        threads = [threading.Thread(target=call) for _ in range(2)]
+        threads[0].start()
+        entered.wait(5)
+        threads[1].start()
+        for thread in threads:
+            thread.join()
+        
+        assert len(vault["requests"]) == 1
+        assert [t.access_token for t in results] == ["new", "new"]
+    
+    def test_network_error_keeps_token(self, vault):
+        """Test transport failures keep the current token."""
+        vault["token"] = self._token(60)
+        
+        def fail(request):
+            raise httpx.ConnectError("down", request=request)
+        
+        vault["respond"] = fail
+        assert auth.ensure_fresh_token("acme", VAULT_URL) is vault["token"]
+        assert vault["saved"] == []
+    
+    @pytest.mark.parametrize("content", [b"<html>", b"[]", b'{"expires_in": 60}'])
+    def test_malformed_response_keeps_token(self, vault, content):
+        """Test a 200 that is not a token response counts as a failed refresh."""
+        vault["token"] = self._token(60)
+        vault["respond"] = lambda request: httpx.Response(200, content=content)
+        
+        assert auth.ensure_fresh_token("acme", VAULT_URL) is vault["token"]
+        assert vault["saved"] == []
@@ -0,0 +1,109 @@
+"""Tests for the env record cache."""
+
+import pytest
+
+from ikv_secrets import cache
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache(tmp_path, monkeypatch):
+    """Point the disk cache at a temp dir and start with empty memory."""
+    monkeypatch.setattr(cache, "CACHE_DIR", tmp_path / "cache")
+    cache.clear_cache()
+    yield
+    cache.clear_cache()
+
+
+class TestParseMaxAge:
+    """Tests for Cache-Control parsing."""
+    
+    def test_missing_header(self):
+        """Test no header means no caching."""
+        assert cache.parse_max_age(None) == 0
+    
+    def test_max_age(self):
+        """Test max-age is honoured."""
+        assert cache.parse_max_age("private, max-age=120") == 120
+    
+    def test_no_store_wins(self):
+        """Test no-store disables caching."""
+        assert cache.parse_max_age("max-age=120, no-store") == 0
+    
+    def test_invalid_value(self):
+        """Test malformed max-age disables caching."""
+        assert cache.parse_max_age("max-age=soon") == 0
+
+
+URL = "https://vault.test"
+
+
+class TestEnvCache:
+    """Tests for get_cached_env/set_cached_env."""
+    
+    def test_memory_roundtrip(self):
+        """Test cached record is returned as a copy."""
+        cache.set_cached_env(URL, "acme", "prod", {"A": "1"}, 60, "tok", disk=False)
+        
+        result = cache.get_cached_env(URL, "acme", "prod", "tok")
+        assert result == {"A": "1"}
+        
+        result["A"] = "changed"
+        assert cache.get_cached_env(URL, "acme", "prod", "tok") == {"A": "1"}
+    
+    def test_zero_ttl_not_cached(self):
+        """Test records without a lifetime are not cached."""
+        cache.set_cached_env(URL, "acme", "prod", {"A": "1"}, 0, "tok")
+        assert cache.get_cached_env(URL, "acme", "prod", "tok") is None
+    
+    def test_no_credential_not_cached(self):
+        """Test nothing is cached without a credential to key it on."""
+        cache.set_cached_env(URL, "acme", "prod", {"A": "1"}, 60, None)
+        assert cache.get_cached_env(URL, "acme", "prod", None) is None
+        assert not cache._memory
+    
+    def test_keyed_on_vault_and_credential(self):
+        """Test entries are not shared across vaults or credentials."""
+        cache.set_cached_env("https://staging.vault", "acme", "api", {"DB": "staging"}, 60, "tok")
+        
+        assert cache.get_cached_env("https://prod.vault", "acme", "api", "tok") is None
+        assert cache.get_cached_env("https://staging.vault", "acme", "api", "other") is None
+        assert cache.get_cached_env("https://staging.vault", "acme", "api", "tok") == {"DB": "staging"}
+    
+    def test_expired_entry(self, monkeypatch):
+        """Test expired entries are dropped."""
+        cache.set_cached_env(URL, "acme", "prod", {"A": "1"}, 60, "tok", disk=False)
+        
+        real_time = cache.time.time
+        monkeypatch.setattr(cache.time, "time", lambda: real_time() + 120)
+        assert cache.get_cached_env(URL, "acme", "prod", "tok") is None
+    
+    @pytest.mark.skipif(not cache.CRYPTO_AVAILABLE, reason="cryptography not installed")
+    def test_disk_requires_matching_token(self):
+        """Test disk entries only decrypt with the token that wrote them."""
+        cache.set_cached_env(URL, "acme", "prod", {"A": "1"}, 60, "tok-1")
+        with cache._memory_lock:
+            cache._memory.clear()
+        
+        assert cache.get_cached_env(URL, "acme", "prod", "tok-2") is None
+        assert cache.get_cached_env(URL, "acme", "prod", "tok-1") == {"A": "1"}
+    
+    def test_clear_tenant(self):
+        """Test clearing one tenant keeps the others."""
+        cache.set_cached_env(URL, "acme", "prod", {"A": "1"}, 60, "tok")
+        cache.set_cached_env(URL, "other", "prod", {"B": "2"}, 60, "tok")
+        
+        cache.clear_cache("acme")
+        
+        assert cache.get_cached_env(URL, "acme", "prod", "tok") is None
+        assert cache.get_cached_env(URL, "other", "prod", "tok") == {"B": "2"}
+    
+    def test_tenant_is_not_a_path(self, tmp_path):
+        """Test tenant names cannot escape the cache directory."""
+        victim = tmp_path / "victim.txt"
+        victim.write_text("keep")
+        
+        assert cache._tenant_dir("../..").parent == cache.CACHE_DIR
+        assert cache._tenant_dir("a/b").parent == cache.CACHE_DIR
+        cache.clear_cache("..")
+        
+        assert victim.exists()
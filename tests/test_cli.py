@@ -0,0 +1,94 @@
+"""Tests for the command line interface."""
+
+import time
+
+import pytest
+from click.testing import CliRunner
+
+from ikv_secrets import cli
+from ikv_secrets.keyring_store import TokenInfo
+
+
+ENV_VARS = {"API_KEY": "it's", "GREETING": 'say "hi"', "DIR": 'C:\\dir\\"x'}
+
+
+@pytest.fixture
+def fake_client(monkeypatch):
+    """Serve ENV_VARS from a stub client for tenant 'acme'."""
+    class FakeClient:
+        def get_env(self, record):
+            return dict(ENV_VARS)
+    
+    monkeypatch.setattr("ikv_secrets.client._get_client", lambda url, tenant: FakeClient())
+    monkeypatch.setattr("ikv_secrets.config.get_tenant_url", lambda tenant: "https://vault.acme.com")
+
+
+class TestOutput:
+    """Tests for load/export output."""
+    
+    def test_load(self, fake_client):
+        """Test load prints one single-quoted export per variable."""
+        result = CliRunner().invoke(cli.main, ["load", "prod", "-t", "acme"])
+        
+        assert result.exit_code == 0
+        assert result.output == (
+            "export API_KEY='it'\"'\"'s'\n"
+            "export GREETING='say \"hi\"'\n"
+            "export DIR='C:\\dir\\\"x'\n"
+        )
+    
+    def test_export_shell(self, fake_client):
+        """Test shell export matches load."""
+        runner = CliRunner()
+        result = runner.invoke(cli.main, ["export", "prod", "-t", "acme", "-f", "shell"])
+        
+        assert result.output == runner.invoke(cli.main, ["load", "prod", "-t", "acme"]).output
+    
+    def test_export_dotenv(self, fake_client):
+        """Test dotenv export escapes double quotes and backslashes."""
+        result = CliRunner().invoke(cli.main, ["export", "prod", "-t", "acme"])
+        
+        assert result.exit_code == 0
+        assert result.output == (
+            'API_KEY="it\'s"\n'
+            'GREETING="say \\"hi\\""\n'
+            'DIR="C:\\\\dir\\\\\\"x"\n'
+        )
+    
+    def test_export_docker(self, fake_client):
+        """Test docker export writes raw values."""
+        result = CliRunner().invoke(cli.main, ["export", "prod", "-t", "acme", "-f", "docker"])
+        
+        assert result.output == "API_KEY=it's\nGREETING=say \"hi\"\nDIR=C:\\dir\\\"x\n"
+
+
+class TestLogin:
+    """Tests for the login command."""
+    
+    def test_already_logged_in(self, monkeypatch):
+        """Test a valid stored token short-circuits login."""
+        monkeypatch.setattr(
+            "ikv_secrets.keyring_store.get_token",
+            lambda tenant: TokenInfo("tok", int(time.time()) + 3600, tenant),
+        )
+        monkeypatch.setattr("ikv_secrets.auth.login", lambda **kwargs: pytest.fail("login called"))
+        
+        result = CliRunner().invoke(cli.main, ["login", "-t", "acme"])
+        
+        assert result.exit_code == 0
+        assert "Already logged in" in result.output
+    
+    def test_force_skips_token_lookup(self, monkeypatch):
+        """Test --force logs in without reading the stored token."""
+        monkeypatch.setattr(
+            "ikv_secrets.keyring_store.get_token", lambda tenant: pytest.fail("token read")
+        )
+        monkeypatch.setattr(
+            "ikv_secrets.auth.login",
+            lambda **kwargs: TokenInfo("new", int(time.time()) + 3600, kwargs["tenant"]),
+        )
+        
+        result = CliRunner().invoke(cli.main, ["login", "-t", "acme", "--force"])
+        
+        assert result.exit_code == 0
+        assert "Logged in to 'acme'" in result.output
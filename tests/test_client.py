@@ -0,0 +1,236 @@
+"""Tests for IKVClient."""
+
+import hashlib
+import hmac
+import time
+
+import httpx
+import pytest
+
+from ikv_secrets import cache, transport
+from ikv_secrets.auth import logout
+from ikv_secrets.client import AuthenticationError, IKVClient, IKVClientError, _get_client
+from ikv_secrets.keyring_store import TokenInfo
+
+
+VAULT_URL = "https://vault.test"
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(tmp_path, monkeypatch):
+    """Isolate the record cache."""
+    monkeypatch.setattr(cache, "CACHE_DIR", tmp_path / "cache")
+    cache.clear_cache()
+    yield
+    cache.clear_cache()
+
+
+def make_client(monkeypatch, handler) -> IKVClient:
+    """Create a service-account client whose requests go to handler."""
+    mock = httpx.MockTransport(handler)
+    monkeypatch.setitem(
+        transport._CLIENTS, VAULT_URL, httpx.Client(base_url=VAULT_URL, transport=mock)
+    )
+    monkeypatch.setattr(
+        "ikv_secrets.client.new_async_http_client",
+        lambda url: httpx.AsyncClient(base_url=url, transport=mock),
+    )
+    return IKVClient(VAULT_URL, "acme", api_key="key", master_key="master")
+
+
+class TestGetEnv:
+    """Tests for single-record fetches."""
+    
+    def test_returns_variables(self, monkeypatch):
+        """Test variables are returned from the response."""
+        client = make_client(
+            monkeypatch, lambda request: httpx.Response(200, json={"variables": {"A": "1"}})
+        )
+        assert client.get_env("prod") == {"A": "1"}
+    
+    def test_cached_with_max_age(self, monkeypatch):
+        """Test a max-age response is served from cache afterwards."""
+        calls = []
+        
+        def handler(request):
+            calls.append(request.url.path)
+            return httpx.Response(
+                200, json={"variables": {"A": "1"}}, headers={"Cache-Control": "max-age=60"}
+            )
+        
+        client = make_client(monkeypatch, handler)
+        client.get_env("prod")
+        assert client.get_env("prod") == {"A": "1"}
+        assert calls == ["/api/v1/env/prod"]
+    
+    def test_cache_not_shared_across_credentials(self, monkeypatch):
+        """Test a cached record is not served to other credentials."""
+        calls = []
+        
+        def handler(request):
+            calls.append(request.headers["X-API-Key"])
+            return httpx.Response(
+                200, json={"variables": {"A": "1"}}, headers={"Cache-Control": "max-age=60"}
+            )
+        
+        make_client(monkeypatch, handler).get_env("prod")
+        IKVClient(VAULT_URL, "acme", api_key="other", master_key="master").get_env("prod")
+        assert calls == ["key", "other"]
+    
+    def test_not_found(self, monkeypatch):
+        """Test 404 raises IKVClientError."""
+        client = make_client(monkeypatch, lambda request: httpx.Response(404))
+        with pytest.raises(IKVClientError, match="not found"):
+            client.get_env("missing")
+
+
+class TestGetEnvs:
+    """Tests for batch fetches."""
+    
+    def test_batch_endpoint(self, monkeypatch):
+        """Test records are fetched with a single batch request."""
+        calls = []
+        
+        def handler(request):
+            calls.append(request.url.path)
+            return httpx.Response(200, json={"records": {
+                "a": {"variables": {"A": "1"}},
+                "b": {"variables": {"B": "2"}},
+            }})
+        
+        client = make_client(monkeypatch, handler)
+        assert client.get_envs(["a", "b"]) == {"a": {"A": "1"}, "b": {"B": "2"}}
+        assert calls == ["/api/v1/env/batch"]
+    
+    def test_falls_back_without_batch_endpoint(self, monkeypatch):
+        """Test per-record requests are used when batch is unsupported."""
+        def handler(request):
+            if request.url.path == "/api/v1/env/batch":
+                return httpx.Response(404)
+            name = request.url.path.rsplit("/", 1)[1]
+            return httpx.Response(200, json={"variables": {name.upper(): name}})
+        
+        client = make_client(monkeypatch, handler)
+        assert client.get_envs(["a", "b"]) == {"a": {"A": "a"}, "b": {"B": "b"}}
+    
+    def test_missing_record_in_batch(self, monkeypatch):
+        """Test a record absent from the batch response raises."""
+        client = make_client(
+            monkeypatch, lambda request: httpx.Response(200, json={"records": {}})
+        )
+        with pytest.raises(IKVClientError, match="'a' not found"):
+            client.get_envs(["a"])
+
+
+class TestAuthHeaders:
+    """Tests for interactive auth header caching."""
+    
+    def test_token_read_once(self, monkeypatch):
+        """Test the keyring is not read again while the token is valid."""
+        reads = []
+        
+        def ensure_fresh_token(tenant, url):
+            reads.append(tenant)
+            return TokenInfo("tok", int(time.time()) + 3600, tenant)
+        
+        monkeypatch.setattr("ikv_secrets.client.ensure_fresh_token", ensure_fresh_token)
+        client = IKVClient(VAULT_URL, "acme")
+        
+        assert client._get_auth_headers() == {"Authorization": "Bearer tok"}
+        assert client._get_auth_headers() == {"Authorization": "Bearer tok"}
+        assert reads == ["acme"]
+    
+    def test_refreshes_when_headers_expire(self, monkeypatch):
+        """Test a long-lived client picks up a refreshed token."""
+        tokens = iter([
+            TokenInfo("old", int(time.time()) + 3600, "acme"),
+            TokenInfo("new", int(time.time()) + 7200, "acme"),
+        ])
+        monkeypatch.setattr("ikv_secrets.client.ensure_fresh_token", lambda tenant, url: next(tokens))
+        client = IKVClient(VAULT_URL, "acme")
+        assert client._get_auth_headers() == {"Authorization": "Bearer old"}
+        
+        real_time = time.time
+        monkeypatch.setattr("ikv_secrets.client.time.time", lambda: real_time() + 3400)
+        assert client._get_auth_headers() == {"Authorization": "Bearer new"}
+        assert client._token.access_token == "new"
+    
+    def test_headers_expire_at_refresh_margin(self, monkeypatch):
+        """Test long-lived tokens are re-checked at 10% of their lifetime."""
+        now = int(time.time())
+        reads = []
+        
+        def ensure_fresh_token(tenant, url):
+            reads.append(tenant)
+            return TokenInfo("tok", now + 36000, tenant, issued_at=now)
+        
+        monkeypatch.setattr("ikv_secrets.client.ensure_fresh_token", ensure_fresh_token)
+        client = IKVClient(VAULT_URL, "acme")
+        client._get_auth_headers()
+        
+        monkeypatch.setattr("ikv_secrets.client.time.time", lambda: now + 32300)
+        client._get_auth_headers()
+        assert len(reads) == 1
+        
+        monkeypatch.setattr("ikv_secrets.client.time.time", lambda: now + 32500)
+        client._get_auth_headers()
+        assert len(reads) == 2
+    
+    def test_expired_token_raises(self, monkeypatch):
+        """Test an expired token is reported."""
+        monkeypatch.setattr(
+            "ikv_secrets.client.ensure_fresh_token", lambda tenant, url: TokenInfo("tok", 0, tenant)
+        )
+        client = IKVClient(VAULT_URL, "acme")
+        
+        with pytest.raises(AuthenticationError, match="expired"):
+            client._get_auth_headers()
+    
+    def test_service_account_signature(self, monkeypatch):
+        """Test service-account requests carry a valid HMAC signature."""
+        client = make_client(monkeypatch, lambda request: httpx.Response(200))
+        headers = client._get_auth_headers()
+        
+        message = f"{headers['X-Timestamp']}:{headers['X-Nonce']}:acme".encode()
+        expected = hmac.new(b"key", message, hashlib.sha256).hexdigest()
+        assert headers["X-Signature"] == expected
+        assert client._get_auth_headers()["X-Nonce"] != headers["X-Nonce"]
+
+
+class TestFromEnv:
+    """Tests for client reuse via from_env."""
+    
+    @pytest.fixture(autouse=True)
+    def interactive_env(self, monkeypatch):
+        """Point from_env at the test vault without credentials."""
+        monkeypatch.setenv("IKV_VAULT_URL", VAULT_URL + "/")
+        monkeypatch.setenv("IKV_TENANT", "acme")
+        monkeypatch.delenv("IKV_API_KEY", raising=False)
+        monkeypatch.delenv("IKV_MASTER_KEY", raising=False)
+        monkeypatch.setattr("ikv_secrets.client.ensure_fresh_token", lambda tenant, url: None)
+        _get_client.cache_clear()
+        yield
+        _get_client.cache_clear()
+    
+    def test_interactive_client_shared(self):
+        """Test interactive clients are reused per vault and tenant."""
+        client = IKVClient.from_env()
+        assert IKVClient.from_env() is client
+        assert _get_client(VAULT_URL, "acme") is client
+    
+    def test_logout_drops_shared_clients(self, monkeypatch):
+        """Test logging out discards clients holding the old token."""
+        monkeypatch.setattr("ikv_secrets.auth.delete_token", lambda tenant: None)
+        client = IKVClient.from_env()
+        
+        logout("acme")
+        
+        assert IKVClient.from_env() is not client
+    
+    def test_service_account_not_shared(self, monkeypatch):
+        """Test clients with credentials are always created fresh."""
+        monkeypatch.setenv("IKV_API_KEY", "key")
+        monkeypatch.setenv("IKV_MASTER_KEY", "master")
+        
+        assert IKVClient.from_env() is not IKVClient.from_env()
+        assert _get_client.cache_info().currsize == 0
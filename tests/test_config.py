@@ -0,0 +1,158 @@
+"""Tests for configuration management."""
+
+import sys
+
+import pytest
+
+from ikv_secrets import config
+
+
+@pytest.fixture(autouse=True)
+def config_dir(tmp_path, monkeypatch):
+    """Use a temp config dir and an empty parse cache."""
+    monkeypatch.setattr(config, "get_config_dir", lambda: tmp_path)
+    monkeypatch.setattr(config, "_CONFIG_CACHE", None)
+    return tmp_path
+
+
+class TestGetConfig:
+    """Tests for get_config caching."""
+    
+    def test_missing_file(self):
+        """Test default config when no file exists."""
+        assert config.get_config() == {"tenants": {}}
+    
+    def test_roundtrip(self):
+        """Test saved tenant config is read back."""
+        config.save_tenant_config("acme", "https://vault.acme.com", "prod")
+        
+        assert config.get_tenant_url("acme") == "https://vault.acme.com"
+        assert config.get_config()["tenants"]["acme"]["default_record"] == "prod"
+    
+    def test_parsed_once_while_unchanged(self, monkeypatch):
+        """Test an unchanged file is not parsed again."""
+        config.save_tenant_config("acme", "https://vault.acme.com")
+        config.get_config()
+        
+        def fail(*args, **kwargs):
+            raise AssertionError("config parsed again")
+        
+        monkeypatch.setattr(config, "loads", fail)
+        assert config.get_tenant_url("acme") == "https://vault.acme.com"
+    
+    def test_save_invalidates(self):
+        """Test saving makes the next read see the new content."""
+        config.save_tenant_config("acme", "https://one.example.com")
+        assert config.get_tenant_url("acme") == "https://one.example.com"
+        
+        config.save_tenant_config("acme", "https://two.example.com")
+        assert config.get_tenant_url("acme") == "https://two.example.com"
+    
+    def test_save_tenant_keeps_cache(self, monkeypatch):
+        """Test saving tenants neither re-reads nor re-parses the file."""
+        config.save_tenant_config("acme", "https://vault.acme.com")
+        
+        def fail(*args, **kwargs):
+            raise AssertionError("config parsed again")
+        
+        monkeypatch.setattr(config, "loads", fail)
+        config.save_tenant_config("beta", "https://vault.beta.com")
+        
+        assert config.get_tenant_url("acme") == "https://vault.acme.com"
+        assert config.get_tenant_url("beta") == "https://vault.beta.com"
+    
+    def test_failed_save_keeps_cache(self, monkeypatch):
+        """Test a failed write leaves the cached config untouched."""
+        config.save_tenant_config("acme", "https://vault.acme.com")
+        
+        def fail(path, data):
+            raise OSError("disk full")
+        
+        monkeypatch.setattr(config, "write_private", fail)
+        with pytest.raises(OSError):
+            config.save_tenant_config("beta", "https://vault.beta.com")
+        
+        assert config.get_tenant_url("beta") is None
+        assert list(config.get_config()["tenants"]) == ["acme"]
+    
+    def test_returned_config_is_a_copy(self):
+        """Test changing the returned dict does not change the cache."""
+        config.save_tenant_config("acme", "https://vault.acme.com")
+        
+        config.get_config()["tenants"]["acme"]["url"] = "https://evil.example.com"
+        
+        assert config.get_tenant_url("acme") == "https://vault.acme.com"
+    
+    def test_saved_private(self, config_dir):
+        """Test the config file is only readable by its owner."""
+        config.save_config({"tenants": {}})
+        
+        assert (config_dir / "config.json").stat().st_mode & 0o777 == 0o600
+        assert not (config_dir / "config.json.tmp").exists()
+    
+    def test_migrates_legacy_yaml(self, config_dir):
+        """Test config.yaml from older releases is converted to JSON."""
+        yaml = pytest.importorskip("yaml")
+        legacy = config_dir / "config.yaml"
+        legacy.write_text(yaml.dump({"tenants": {"acme": {"url": "https://vault.acme.com"}}}))
+        
+        assert config.get_tenant_url("acme") == "https://vault.acme.com"
+        assert not legacy.exists()
+        assert (config_dir / "config.json").exists()
+    
+    def test_migrates_legacy_yaml_without_pyyaml(self, config_dir, monkeypatch):
+        """Test the legacy format is migrated when PyYAML is missing."""
+        monkeypatch.setitem(sys.modules, "yaml", None)
+        legacy = config_dir / "config.yaml"
+        legacy.write_text(
+            "# ikv-secrets\n"
+            "tenants:\n"
+            "  acme:\n"
+            "    default_record: prod\n"
+            "    url: https://vault.acme.com\n"
+            "  'beta':\n"
+            "    url: \"https://vault.beta.com:8443\"\n"
+        )
+        
+        assert config.get_config() == {
+            "tenants": {
+                "acme": {"default_record": "prod", "url": "https://vault.acme.com"},
+                "beta": {"url": "https://vault.beta.com:8443"},
+            }
+        }
+        assert not legacy.exists()
+    
+    def test_unreadable_legacy_yaml_warns(self, config_dir, monkeypatch, capsys):
+        """Test a legacy file the built-in parser can't read is kept with a warning."""
+        monkeypatch.setitem(sys.modules, "yaml", None)
+        legacy = config_dir / "config.yaml"
+        legacy.write_text("tenants:\n  - acme\n")
+        
+        assert config.get_config() == {"tenants": {}}
+        assert legacy.exists()
+        err = capsys.readouterr().err
+        assert "config.yaml" in err
+        assert "pip install pyyaml" in err
+
+
+class TestParseLegacyYaml:
+    """Tests for the built-in legacy config parser."""
+    
+    def test_matches_pyyaml(self):
+        """Test configs written by older releases parse like PyYAML does."""
+        yaml = pytest.importorskip("yaml")
+        data = {
+            "require_explicit_url": True,
+            "tenants": {
+                "acme": {"url": "https://vault.acme.com", "default_record": "prod-api"},
+                "b": {"url": "http://localhost:5001"},
+                "yes": {"url": "https://x.example.com/path#frag"},
+            },
+        }
+        text = yaml.dump(data, default_flow_style=False)
+        
+        assert config._parse_legacy_yaml(text) == yaml.safe_load(text)
+    
+    def test_empty_tenants(self):
+        """Test an empty mapping written in flow style."""
+        assert config._parse_legacy_yaml("tenants: {}\n") == {"tenants": {}}
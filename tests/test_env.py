@@ -1,5 +1,7 @@
 """Tests for EnvProxy."""
 
+import pickle
+
 import pytest
 from unittest.mock import MagicMock, patch
 
@@ -23,6 +25,28 @@ class TestEnvProxy:
         with pytest.raises(AttributeError, match="DATABASE_URL"):
             _ = proxy.DATABASE_URL
     
+    def test_getattr_error_lists_available(self):
+        """Test the missing-variable error names what is available."""
+        proxy = EnvProxy()
+        proxy._loaded = True
+        proxy._cache = {"A": "1", "B": "2"}
+        
+        assert not hasattr(proxy, "MISSING")
+        with pytest.raises(AttributeError, match="'MISSING' not found. Available: A, B"):
+            _ = proxy.MISSING
+    
+    def test_getattr_error_pickles(self):
+        """Test the missing-variable error survives pickling."""
+        proxy = EnvProxy()
+        proxy._loaded = True
+        proxy._cache = {"A": "1"}
+        
+        with pytest.raises(AttributeError) as excinfo:
+            _ = proxy.MISSING
+        
+        restored = pickle.loads(pickle.dumps(excinfo.value))
+        assert str(restored) == str(excinfo.value)
+    
     def test_getattr_returns_cached_value(self):
         """Test accessing cached value works."""
         proxy = EnvProxy()
@@ -48,6 +72,19 @@ class TestEnvProxy:
         assert proxy.has("EXISTS")
         assert not proxy.has("MISSING")
     
+    def test_keys_memoized(self):
+        """Test keys are computed once per load."""
+        proxy = EnvProxy()
+        proxy._loaded = True
+        proxy._cache = {"A": "1", "B": "2"}
+        
+        assert proxy.keys() == ("A", "B")
+        assert proxy.keys() is proxy.keys()
+        
+        proxy.clear()
+        proxy._loaded = True
+        assert proxy.keys() == ()
+    
     def test_to_dotenv(self):
         """Test dotenv export format."""
         proxy = EnvProxy()
@@ -70,6 +107,30 @@ class TestEnvProxy:
         result = proxy.to_shell()
         assert 'export API_KEY="secret123"' in result
     
+    def test_to_dotenv_escapes(self):
+        """Test dotenv export escapes quotes and backslashes."""
+        proxy = EnvProxy()
+        proxy._loaded = True
+        proxy._cache = {"PASSWORD": 'a"b\\c'}
+        
+        assert proxy.to_dotenv() == 'PASSWORD="a\\"b\\\\c"'
+    
+    def test_to_dotenv_bytes(self):
+        """Test binary dotenv export is UTF-8 encoded."""
+        proxy = EnvProxy()
+        proxy._loaded = True
+        proxy._cache = {"GREETING": "héllo", "N": "1"}
+        
+        assert proxy.to_dotenv_bytes() == 'GREETING="héllo"\nN="1"'.encode()
+    
+    def test_to_shell_escapes(self):
+        """Test shell export keeps special characters literal."""
+        proxy = EnvProxy()
+        proxy._loaded = True
+        proxy._cache = {"PASSWORD": 'a"$HOME`id`\\'}
+        
+        assert proxy.to_shell() == 'export PASSWORD="a\\"\\$HOME\\`id\\`\\\\"'
+    
     def test_clear(self):
         """Test clearing cached data."""
         proxy = EnvProxy()
@@ -0,0 +1,41 @@
+"""Tests for file helpers."""
+
+import os
+
+import pytest
+
+from ikv_secrets import fsutil
+
+
+class TestWritePrivate:
+    """Tests for write_private."""
+    
+    def test_replaces_with_private_file(self, tmp_path):
+        """Test the result is 0600 even if the old file and a stale temp were not."""
+        path = tmp_path / "tokens.json"
+        path.write_text("old")
+        os.chmod(path, 0o644)
+        stale = tmp_path / "tokens.json.tmp"
+        stale.write_text("stale")
+        os.chmod(stale, 0o644)
+        
+        fsutil.write_private(path, b"new")
+        
+        assert path.read_bytes() == b"new"
+        assert path.stat().st_mode & 0o777 == 0o600
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["tokens.json", "tokens.json.tmp"]
+    
+    def test_temp_removed_on_failure(self, tmp_path, monkeypatch):
+        """Test a failed write leaves the old file and no temp behind."""
+        path = tmp_path / "config.json"
+        path.write_text("old")
+        
+        def fail(src, dst):
+            raise OSError("disk full")
+        
+        monkeypatch.setattr(fsutil.os, "replace", fail)
+        with pytest.raises(OSError):
+            fsutil.write_private(path, b"new")
+        
+        assert path.read_text() == "old"
+        assert [p.name for p in tmp_path.iterdir()] == ["config.json"]
@@ -0,0 +1,35 @@
+"""Tests for JSON helpers."""
+
+import pytest
+
+from ikv_secrets import jsonlib
+
+
+@pytest.fixture(params=[True, False], ids=["orjson", "stdlib"])
+def backend(request, monkeypatch):
+    """Run each test with and without orjson."""
+    if request.param and not jsonlib.ORJSON_AVAILABLE:
+        pytest.skip("orjson not installed")
+    monkeypatch.setattr(jsonlib, "ORJSON_AVAILABLE", request.param)
+
+
+class TestJsonlib:
+    """Tests for loads/dumps."""
+    
+    def test_roundtrip(self, backend):
+        """Test bytes and str input parse to the same object."""
+        data = {"KEY": "välue", "N": 1}
+        encoded = jsonlib.dumps(data)
+        
+        assert isinstance(encoded, bytes)
+        assert jsonlib.loads(encoded) == data
+        assert jsonlib.loads(encoded.decode()) == data
+    
+    def test_indent(self, backend):
+        """Test pretty-printing uses two spaces."""
+        assert jsonlib.dumps({"A": "1"}, indent=True) == b'{\n  "A": "1"\n}'
+    
+    def test_invalid(self, backend):
+        """Test invalid input raises ValueError."""
+        with pytest.raises(ValueError):
+            jsonlib.loads(b"{not json")
@@ -0,0 +1,133 @@
+"""Tests for token storage."""
+
+import time
+
+import pytest
+
+from ikv_secrets import keyring_store
+from ikv_secrets.keyring_store import TokenInfo
+
+
+class TestTokenInfo:
+    """Tests for TokenInfo."""
+    
+    def test_is_expired_with_buffer(self):
+        """Test tokens count as expired 5 minutes early."""
+        now = int(time.time())
+        assert TokenInfo("tok", now + 200, "acme").is_expired
+        assert not TokenInfo("tok", now + 3600, "acme").is_expired
+    
+    def test_is_expired_reuses_recent_answer(self):
+        """Test the expiry check is cached briefly."""
+        token = TokenInfo("tok", int(time.time()) + 3600, "acme")
+        assert not token.is_expired
+        
+        token.expires_at = 0
+        assert not token.is_expired
+        
+        token._expired_cache = None
+        assert token.is_expired
+    
+    def test_is_near_expiry(self):
+        """Test slack-based expiry check."""
+        token = TokenInfo("tok", int(time.time()) + 600, "acme")
+        assert token.is_near_expiry(900)
+        assert not token.is_near_expiry(300)
+    
+    def test_expiry_view(self):
+        """Test the combined view matches the individual properties."""
+        now = int(time.time())
+        assert TokenInfo("tok", now + 200, "acme").expiry_view()[0]
+        
+        expired, expires_in = TokenInfo("tok", now + 3600, "acme").expiry_view()
+        assert not expired
+        assert 3590 <= expires_in <= 3600
+        assert TokenInfo("tok", 0, "acme").expiry_view() == (True, 0)
+    
+    def test_json_roundtrip(self):
+        """Test serialization keeps refresh fields."""
+        token = TokenInfo("tok", 2000, "acme", refresh_token="ref", refresh_expires_at=3000, issued_at=1000)
+        assert TokenInfo.from_json(token.to_json()) == token
+    
+    def test_from_legacy_json(self):
+        """Test tokens stored before refresh support still load."""
+        token = TokenInfo.from_json('{"access_token": "tok", "expires_at": 2000, "tenant": "acme"}')
+        assert token.refresh_token is None
+        assert token.refresh_expires_at == 0
+    
+    def test_file_roundtrip(self, tmp_path, monkeypatch):
+        """Test tokens saved to the tokens file load back unchanged."""
+        monkeypatch.setattr(keyring_store, "CONFIG_DIR", tmp_path)
+        monkeypatch.setattr(keyring_store, "TOKENS_FILE", tmp_path / "tokens.json")
+        monkeypatch.setattr(keyring_store, "_use_file_fallback", lambda: True)
+        token = TokenInfo("tok", 2000, "acme", refresh_token="ref", issued_at=1000)
+        
+        keyring_store.save_token("acme", token)
+        
+        assert keyring_store._load_tokens_file()["acme"] == token.to_dict()
+        assert keyring_store.get_token("acme") == token
+        assert (tmp_path / "tokens.json").stat().st_mode & 0o777 == 0o600
+        assert not (tmp_path / "tokens.json.tmp").exists()
+
+
+class TestFileFallback:
+    """Tests for the keyring probe cache."""
+    
+    def test_probe_runs_once(self, monkeypatch):
+        """Test the keyring is probed only on first use."""
+        calls = []
+        
+        def probe():
+            calls.append(1)
+            return True
+        
+        monkeypatch.setattr(keyring_store, "_probe_keyring", probe)
+        keyring_store._reset_fallback_cache()
+        try:
+            assert keyring_store._use_file_fallback()
+            assert keyring_store._use_file_fallback()
+            assert calls == [1]
+        finally:
+            keyring_store._reset_fallback_cache()
+
+
+    def test_probe_falls_back_on_keyring_errors(self, monkeypatch):
+        """Test backend failures select the file fallback."""
+        def broken(*args):
+            raise keyring_store.KeyringError("locked")
+        
+        monkeypatch.setattr(keyring_store.keyring, "get_password", broken)
+        assert keyring_store._probe_keyring()
+    
+    def test_probe_propagates_unexpected_errors(self, monkeypatch):
+        """Test bugs are not hidden behind the file fallback."""
+        def broken(*args):
+            raise TypeError("bug")
+        
+        monkeypatch.setattr(keyring_store.keyring, "get_password", broken)
+        with pytest.raises(TypeError):
+            keyring_store._probe_keyring()
+
+
+class TestGetAllTokens:
+    """Tests for bulk token lookup."""
+    
+    def test_file_fallback_reads_once(self, monkeypatch):
+        """Test the tokens file is loaded once for all tenants."""
+        loads = []
+        
+        def load_tokens_file():
+            loads.append(1)
+            return {
+                "acme": {"access_token": "a", "expires_at": 2000, "tenant": "acme"},
+                "beta": {"access_token": "b", "expires_at": 2000, "tenant": "beta"},
+            }
+        
+        monkeypatch.setattr(keyring_store, "_use_file_fallback", lambda: True)
+        monkeypatch.setattr(keyring_store, "_load_tokens_file", load_tokens_file)
+        
+        tokens = keyring_store.get_all_tokens(["acme", "beta", "missing"])
+        
+        assert sorted(tokens) == ["acme", "beta"]
+        assert tokens["beta"].access_token == "b"
+        assert loads == [1]
@@ -0,0 +1,50 @@
+"""Tests for the shared HTTP transport."""
+
+import ssl
+
+import pytest
+
+from ikv_secrets import transport
+
+
+@pytest.fixture(autouse=True)
+def verify_env(monkeypatch):
+    """Start every test with IKV_VERIFY_SSL unset."""
+    monkeypatch.delenv("IKV_VERIFY_SSL", raising=False)
+
+
+class TestVerifyFor:
+    """Tests for choosing certificate verification per vault."""
+    
+    @pytest.mark.parametrize("url", [
+        "https://localhost:5001",
+        "https://127.0.0.1",
+        "https://[::1]:5001/",
+    ])
+    def test_loopback_not_verified(self, url):
+        """Test local dev vaults skip certificate checks."""
+        ctx = transport._verify_for(url)
+        
+        assert ctx.verify_mode == ssl.CERT_NONE
+        assert not ctx.check_hostname
+    
+    def test_remote_verified(self):
+        """Test remote vaults require a valid certificate and hostname."""
+        ctx = transport._verify_for("https://vault.acme.com")
+        
+        assert ctx.verify_mode == ssl.CERT_REQUIRED
+        assert ctx.check_hostname
+        assert ctx.minimum_version == ssl.TLSVersion.TLSv1_2
+    
+    @pytest.mark.parametrize("value", ["false", "0", "no", "FALSE"])
+    def test_env_disables_verification(self, monkeypatch, value):
+        """Test IKV_VERIFY_SSL can turn verification off for remote vaults."""
+        monkeypatch.setenv("IKV_VERIFY_SSL", value)
+        
+        assert transport._verify_for("https://vault.acme.com").verify_mode == ssl.CERT_NONE
+    
+    def test_env_true_keeps_verification(self, monkeypatch):
+        """Test other IKV_VERIFY_SSL values keep verification on."""
+        monkeypatch.setenv("IKV_VERIFY_SSL", "true")
+        
+        assert transport._verify_for("https://vault.acme.com").verify_mode == ssl.CERT_REQUIRED